@@ -1,13 +1,11 @@
 from typing import Dict, Any
 
 import numpy as np
-import joblib
 from sklearn.linear_model import LogisticRegression
 
+from src.context import PipelineContext, resolve_context
 from src.utils import (
-    MODELS_DIR,
     REPORTS_DIR,
-    load_train_test_data,
     load_json,
     ensure_dir,
     save_json,
@@ -42,10 +40,10 @@ def poisoning_simulation() -> Dict[str, Any]:
     }
 
 
-def surrogate_model_extraction() -> Dict[str, Any]:
-    X_train, X_test, y_train, y_test = load_train_test_data()
-    target_model = joblib.load(MODELS_DIR / "model.pkl")
-    target_proba = target_model.predict_proba(X_train)[:, 1]
+def surrogate_model_extraction(ctx: PipelineContext = None) -> Dict[str, Any]:
+    ctx = resolve_context(ctx)
+    X_train, X_test, y_train, y_test = ctx.data
+    target_proba = ctx.predict_proba("train")[:, 1]
     pseudo_labels = (target_proba > 0.5).astype(int)
     surrogate = LogisticRegression(max_iter=500, solver="liblinear")
     surrogate.fit(X_train, pseudo_labels)
@@ -59,8 +57,9 @@ def surrogate_model_extraction() -> Dict[str, Any]:
     }
 
 
-def backdoor_trigger_scanner() -> Dict[str, Any]:
-    X_train, X_test, y_train, y_test = load_train_test_data()
+def backdoor_trigger_scanner(ctx: PipelineContext = None) -> Dict[str, Any]:
+    ctx = resolve_context(ctx)
+    X_train, X_test, y_train, y_test = ctx.data
     feature_means = np.mean(X_train.values, axis=0)
     feature_max = np.max(X_train.values, axis=0)
     ratios = feature_max / (feature_means + 1e-6)
@@ -100,12 +99,13 @@ def poison_gpt_supply_chain_simulation() -> Dict[str, Any]:
     }
 
 
-def run() -> Dict[str, Any]:
+def run(ctx: PipelineContext = None) -> Dict[str, Any]:
+    ctx = resolve_context(ctx)
     results = {
         "evasion": evasion_attack_simulation(),
         "poisoning": poisoning_simulation(),
-        "surrogate_extraction": surrogate_model_extraction(),
-        "backdoor_scan": backdoor_trigger_scanner(),
+        "surrogate_extraction": surrogate_model_extraction(ctx),
+        "backdoor_scan": backdoor_trigger_scanner(ctx),
         "echo_leak": echo_leak_attack_test(),
         "poison_gpt_supply_chain": poison_gpt_supply_chain_simulation(),
     }
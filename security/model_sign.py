@@ -6,7 +6,8 @@ from pathlib import Path
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import padding, rsa
 
-from src.utils import hash_file, REPORTS_DIR, ensure_dir, save_json
+from src.hashing import file_digest
+from src.utils import REPORTS_DIR, ensure_dir, save_json
 
 
 def generate_keys(private_key_path: Path, public_key_path: Path) -> None:
@@ -28,7 +29,8 @@ def generate_keys(private_key_path: Path, public_key_path: Path) -> None:
 
 
 def sign_model(model_path: Path, private_key_path: Path, signature_path: Path) -> dict:
-    digest = hash_file(model_path)
+    # Always hash the bytes on disk; the digest cache is writable by anyone who can write the model.
+    digest = file_digest(model_path, use_cache=False)
     private_key = serialization.load_pem_private_key(
         private_key_path.read_bytes(), password=None
     )
@@ -58,9 +60,15 @@ def sign_model(model_path: Path, private_key_path: Path, signature_path: Path) -
 
 
 def verify_model(model_path: Path, public_key_path: Path, signature_path: Path) -> bool:
-    digest = hash_file(model_path)
-    signature = signature_path.read_bytes()
-    public_key = serialization.load_pem_public_key(public_key_path.read_bytes())
+    return verify_digest(file_digest(model_path, use_cache=False), public_key_path, signature_path)
+
+
+def verify_digest(digest: str, public_key_path: Path, signature_path: Path) -> bool:
+    """Check ``signature_path`` against a SHA-256 the caller computed from the bytes it will load."""
+    if not Path(signature_path).exists():
+        return False
+    signature = Path(signature_path).read_bytes()
+    public_key = serialization.load_pem_public_key(Path(public_key_path).read_bytes())
     try:
         public_key.verify(
             signature,
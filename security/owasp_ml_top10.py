@@ -1,12 +1,10 @@
 from typing import Dict, Any
 
 import numpy as np
-import joblib
 
+from src.context import PipelineContext, resolve_context
 from src.utils import (
-    MODELS_DIR,
     REPORTS_DIR,
-    load_train_test_data,
     load_json,
     ensure_dir,
     save_json,
@@ -38,7 +36,11 @@ def ml02_poisoning_anomaly() -> Dict[str, Any]:
         metrics = load_json(path)
     else:
         metrics = {}
-    score = float(metrics.get("poisoning_risk_score", 0.0))
+    # Label flips leave feature-space outlier scores untouched.
+    score = max(
+        float(metrics.get("poisoning_risk_score", 0.0)),
+        float(metrics.get("label_flip_risk", 0.0)),
+    )
     level = "low"
     if score > 0.7:
         level = "high"
@@ -51,30 +53,40 @@ def ml02_poisoning_anomaly() -> Dict[str, Any]:
     }
 
 
-def ml03_membership_inference() -> Dict[str, Any]:
-    X_train, X_test, y_train, y_test = load_train_test_data()
-    model = joblib.load(MODELS_DIR / "model.pkl")
-    proba_train = model.predict_proba(X_train)[:, 1]
-    proba_test = model.predict_proba(X_test)[:, 1]
+def ml03_membership_inference(ctx: PipelineContext = None) -> Dict[str, Any]:
+    ctx = resolve_context(ctx)
+    proba_train = ctx.predict_proba("train")[:, 1]
+    proba_test = ctx.predict_proba("test")[:, 1]
     gap = float(np.mean(proba_train) - np.mean(proba_test))
     risk_score = float(min(1.0, max(0.0, gap)))
+    result = {"risk": "ML03-Membership-Inference", "avg_confidence_gap": gap}
+    path = REPORTS_DIR / "membership_inference.json"
+    if path.exists():
+        # Prefer the per-sample attacks over the mean confidence gap.
+        attacks = load_json(path)
+        risk_score = float(attacks.get("risk_score", risk_score))
+        result["attacks"] = attacks
+    leakage_path = REPORTS_DIR / "leakage.json"
+    if leakage_path.exists():
+        # Test rows that duplicate training rows are members, so they blunt the attacks above.
+        leakage = load_json(leakage_path)
+        result["train_test_leakage"] = {
+            "exact_duplicate_fraction": leakage.get("exact_duplicate_fraction", 0.0),
+            "near_duplicate_fraction": leakage.get("near_duplicate_fraction", 0.0),
+        }
     level = "low"
     if risk_score > 0.3:
         level = "medium"
     if risk_score > 0.6:
         level = "high"
-    return {
-        "risk": "ML03-Membership-Inference",
-        "avg_confidence_gap": gap,
-        "risk_score": risk_score,
-        "risk_level": level,
-    }
+    result["risk_score"] = risk_score
+    result["risk_level"] = level
+    return result
 
 
-def ml04_model_inversion() -> Dict[str, Any]:
-    X_train, X_test, y_train, y_test = load_train_test_data()
-    model = joblib.load(MODELS_DIR / "model.pkl")
-    proba = model.predict_proba(X_train)[:, 1]
+def ml04_model_inversion(ctx: PipelineContext = None) -> Dict[str, Any]:
+    ctx = resolve_context(ctx)
+    proba = ctx.predict_proba("train")[:, 1]
     eps = 1e-12
     entropy = -np.mean(
         proba * np.log(proba + eps) + (1 - proba) * np.log(1 - proba + eps)
@@ -136,12 +148,27 @@ def ml08_drift_detection() -> Dict[str, Any]:
     else:
         data = {}
     drift = bool(data.get("drift_detected", False))
+    # Joint shifts can hide from every per-feature statistic.
+    multivariate_drift = bool(data.get("multivariate", {}).get("drift_detected", False))
+    concept_path = REPORTS_DIR / "concept_drift.json"
+    if concept_path.exists():
+        concept = load_json(concept_path)
+    else:
+        concept = {}
+    streams = concept.get("streams", {})
+    error_drift = bool(streams.get("error", {}).get("drift_detected", False))
+    output_drift = bool(streams.get("proba", {}).get("drift_detected", False))
     level = "low"
-    if drift:
+    if output_drift:
+        level = "medium"
+    if drift or multivariate_drift or error_drift:
         level = "high"
     return {
         "risk": "ML08-Data-Drift",
         "details": data,
+        "univariate_drift": drift,
+        "multivariate_drift": multivariate_drift,
+        "concept_drift": {"error_rate": error_drift, "prediction_distribution": output_drift},
         "risk_level": level,
     }
 
@@ -181,12 +208,13 @@ def ml10_model_signing() -> Dict[str, Any]:
     }
 
 
-def run() -> Dict[str, Any]:
+def run(ctx: PipelineContext = None) -> Dict[str, Any]:
+    ctx = resolve_context(ctx)
     results = {
         "ML01": ml01_adversarial_robustness(),
         "ML02": ml02_poisoning_anomaly(),
-        "ML03": ml03_membership_inference(),
-        "ML04": ml04_model_inversion(),
+        "ML03": ml03_membership_inference(ctx),
+        "ML04": ml04_model_inversion(ctx),
         "ML05": ml05_model_extraction_pattern(),
         "ML06_07": ml06_ml07_supply_chain(),
         "ML08": ml08_drift_detection(),
@@ -1,22 +1,16 @@
 import json
 import subprocess
-from hashlib import sha256
 from pathlib import Path
 
-from src.utils import ROOT, REPORTS_DIR, ensure_dir, save_json
+from src.hashing import hash_files
+from src.utils import ROOT, REPORTS_DIR, ensure_dir, hash_file, save_json
 
 
 BANNED_PACKAGES = {"malicious-lib", "suspicious-pkg"}
 
 
 def compute_hash(path: Path) -> str:
-    h = sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            if not chunk:
-                break
-            h.update(chunk)
-    return h.hexdigest()
+    return hash_file(path)
 
 
 def list_installed_packages() -> list:
@@ -39,10 +33,7 @@ def validate_supply_chain() -> dict:
         ROOT / "docker" / "mlflow.Dockerfile",
         ROOT / "jenkins" / "Jenkinsfile",
     ]
-    hashes = {}
-    for path in files_to_hash:
-        if path.exists():
-            hashes[str(path)] = compute_hash(path)
+    hashes = hash_files([path for path in files_to_hash if path.exists()])
 
     pkgs = list_installed_packages()
     banned_found = [p for p in pkgs if p.get("name") in BANNED_PACKAGES]
@@ -1,23 +1,31 @@
+import argparse
 from pathlib import Path
+from typing import Dict, Sequence
 
 import numpy as np
 import pandas as pd
 from sklearn.metrics import accuracy_score
 import mlflow
 
+from src.attack_engine import attack_direction, is_linear_binary, pgd_attack
+from src.context import PipelineContext, resolve_context
 from src.utils import (
-    load_train_test_data,
-    load_model,
-    configure_mlflow,
+    as_chunks,
     save_json,
     REPORTS_DIR,
 )
 
 
+SWEEP_EPSILONS = tuple(float(e) for e in np.linspace(0.0, 0.5, 26))
+SWEEP_STEPS = (1, 2, 5, 10)
+# Bounds the (epsilons, rows, features) block scored at once in a sweep.
+_SWEEP_BLOCK_ELEMENTS = 1 << 24
+# Dual norm of the weights for each perturbation norm.
+DUAL_NORMS = {"linf": 1, "l2": 2}
+
+
 def generate_fgsm(model, X: pd.DataFrame, epsilon: float = 0.1) -> pd.DataFrame:
-    w = model.coef_[0]
-    noise = epsilon * np.sign(w)
-    X_adv = X.values + noise
+    X_adv = X.values + epsilon * attack_direction(model, X.values, columns=X.columns)
     return pd.DataFrame(X_adv, columns=X.columns)
 
 
@@ -27,22 +35,186 @@ def generate_pgd(
     epsilon: float = 0.2,
     alpha: float = 0.05,
     num_iter: int = 5,
+    restarts: int = 0,
+    max_workers: int = 1,
 ) -> pd.DataFrame:
-    w = model.coef_[0]
-    sign_w = np.sign(w)
-    X_orig = X.values
-    X_adv = X_orig.copy()
-    for _ in range(num_iter):
-        X_adv = X_adv + alpha * sign_w
-        delta = np.clip(X_adv - X_orig, -epsilon, epsilon)
-        X_adv = X_orig + delta
+    X_adv = pgd_attack(
+        model,
+        X,
+        epsilon=epsilon,
+        alpha=alpha,
+        num_iter=num_iter,
+        restarts=restarts,
+        max_workers=max_workers,
+    )
     return pd.DataFrame(X_adv, columns=X.columns)
 
 
-def run_adversarial_tests() -> dict:
-    X_train, X_test, y_train, y_test = load_train_test_data()
-    model = load_model()
-    y_clean = model.predict(X_test)
+def _columns(X):
+    return list(X.columns) if hasattr(X, "columns") else None
+
+
+def fgsm_sweep(model, X, epsilons: Sequence[float], y=None) -> np.ndarray:
+    """FGSM examples for every epsilon at once, shape (n_eps, n_samples, n_features)."""
+    columns = _columns(X)
+    X = np.asarray(X, dtype=float)
+    eps = np.asarray(epsilons, dtype=float)[:, None, None]
+    return X[None] + eps * attack_direction(model, X, y, columns)[None]
+
+
+def pgd_sweep(
+    model,
+    X,
+    epsilons: Sequence[float],
+    alpha: float = 0.05,
+    steps: Sequence[int] = SWEEP_STEPS,
+    y=None,
+) -> np.ndarray:
+    """
+    PGD examples for every (step count, epsilon) pair, iterating all epsilons
+    together; shape (n_steps, n_eps, n_samples, n_features).
+    """
+    columns = _columns(X)
+    X = np.asarray(X, dtype=float)
+    eps = np.asarray(epsilons, dtype=float)[:, None, None]
+    y_rows = None if y is None else np.tile(np.asarray(y), eps.shape[0])
+    X_adv = np.repeat(X[None], eps.shape[0], axis=0)
+    snapshots = {}
+    for i in range(1, max(steps) + 1):
+        # The gradient is taken at every current iterate, so non-linear models get true PGD.
+        direction = attack_direction(model, X_adv.reshape(-1, X.shape[1]), y_rows, columns)
+        X_adv = X[None] + np.clip(X_adv + alpha * direction.reshape(X_adv.shape) - X[None], -eps, eps)
+        if i in steps:
+            snapshots[i] = X_adv
+    return np.stack([snapshots[k] for k in steps])
+
+
+def _batch_accuracy(model, X_batch: np.ndarray, y, columns) -> np.ndarray:
+    """Accuracy of every leading slice of ``X_batch`` from one predict call."""
+    lead = X_batch.shape[:-2]
+    n, d = X_batch.shape[-2:]
+    rows = X_batch.reshape(-1, d)
+    y_pred = np.asarray(model.predict(pd.DataFrame(rows, columns=columns)))
+    correct = y_pred.reshape(-1, n) == np.asarray(y)[None, :]
+    return correct.mean(axis=1).reshape(lead)
+
+
+def area_under_curve(epsilons: Sequence[float], accuracy: Sequence[float]) -> float:
+    """Area under the accuracy-vs-epsilon curve, normalised by the epsilon range."""
+    eps = np.asarray(epsilons, dtype=float)
+    acc = np.asarray(accuracy, dtype=float)
+    if eps.size < 2 or eps[-1] == eps[0]:
+        return float(acc.mean()) if acc.size else 0.0
+    return float(np.sum((acc[1:] + acc[:-1]) / 2 * np.diff(eps)) / (eps[-1] - eps[0]))
+
+
+def robustness_sweep(
+    model,
+    X: pd.DataFrame,
+    y,
+    epsilons: Sequence[float] = SWEEP_EPSILONS,
+    steps: Sequence[int] = SWEEP_STEPS,
+    alpha: float = 0.05,
+    label_aware: bool = True,
+) -> Dict:
+    """
+    Accuracy-vs-epsilon curves for FGSM and for PGD at each step count, with
+    the area under each curve. All epsilons of a block are perturbed and
+    scored together; blocks only split very large sweeps.
+    """
+    epsilons = [float(e) for e in epsilons]
+    steps = sorted({int(k) for k in steps})
+    direction_y = y if label_aware else None
+    per_eps = X.shape[0] * X.shape[1] * (len(steps) + 1)
+    block = max(1, _SWEEP_BLOCK_ELEMENTS // max(per_eps, 1))
+    fgsm_acc, pgd_acc = [], []
+    for start in range(0, len(epsilons), block):
+        eps = epsilons[start:start + block]
+        batch = np.concatenate(
+            [fgsm_sweep(model, X, eps, y=direction_y)[None], pgd_sweep(model, X, eps, alpha, steps, y=direction_y)]
+        )
+        acc = _batch_accuracy(model, batch, y, X.columns)
+        fgsm_acc.append(acc[0])
+        pgd_acc.append(acc[1:])
+    fgsm_acc = np.concatenate(fgsm_acc)
+    pgd_acc = np.concatenate(pgd_acc, axis=1)
+    return {
+        "epsilons": epsilons,
+        "label_aware": label_aware,
+        "pgd_alpha": alpha,
+        "fgsm": {
+            "accuracy": fgsm_acc.tolist(),
+            "aurc": area_under_curve(epsilons, fgsm_acc),
+        },
+        "pgd": {
+            str(k): {"accuracy": acc.tolist(), "aurc": area_under_curve(epsilons, acc)}
+            for k, acc in zip(steps, pgd_acc)
+        },
+    }
+
+
+def minimal_adversarial_distance(model, X, norm: str = "linf") -> np.ndarray:
+    """
+    Exact distance from every row to the decision boundary of a binary linear
+    model: |w.x + b| divided by the dual norm of w (L1 for L-inf, L2 for L2).
+    """
+    dual = np.linalg.norm(model.coef_[0], ord=DUAL_NORMS[norm])
+    margin = np.abs(np.asarray(model.decision_function(X), dtype=float))
+    if dual == 0:
+        return np.full(margin.shape, np.inf)
+    return margin / dual
+
+
+def certified_accuracy(distances: np.ndarray, correct: np.ndarray, radii: Sequence[float]) -> np.ndarray:
+    """Share of rows classified correctly and farther than each radius from the boundary."""
+    certified = np.sort(distances[correct])
+    radii = np.asarray(radii, dtype=float)
+    if distances.size == 0:
+        return np.zeros(radii.shape)
+    return (certified.size - np.searchsorted(certified, radii, side="right")) / distances.size
+
+
+def certified_robustness(
+    model,
+    data,
+    radii: Sequence[float] = SWEEP_EPSILONS,
+    norms: Sequence[str] = tuple(DUAL_NORMS),
+    bins: int = 20,
+) -> Dict:
+    """
+    Certified accuracy curves and distance histograms for ``data`` (an (X, y)
+    pair or a chunk stream) in one O(n * d) pass over the rows.
+    """
+    distances = {norm: [] for norm in norms}
+    correct = []
+    for X, y in as_chunks(data):
+        y_pred = np.asarray(model.predict(X))
+        correct.append(y_pred == np.asarray(y))
+        for norm in norms:
+            distances[norm].append(minimal_adversarial_distance(model, X, norm))
+    correct = np.concatenate(correct)
+    report = {"n_samples": int(correct.size), "radii": [float(r) for r in radii]}
+    for norm in norms:
+        dist = np.concatenate(distances[norm])
+        robust = dist[correct]
+        finite = robust[np.isfinite(robust)]
+        counts, edges = np.histogram(finite, bins=bins, range=(0.0, float(finite.max()) if finite.size else 1.0))
+        curve = certified_accuracy(dist, correct, radii)
+        report[norm] = {
+            "certified_accuracy": curve.tolist(),
+            "aurc": area_under_curve(radii, curve),
+            "median_distance": float(np.median(robust)) if robust.size else 0.0,
+            "mean_distance": float(np.mean(finite)) if finite.size else 0.0,
+            "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+        }
+    return report
+
+
+def run_adversarial_tests(ctx: PipelineContext = None, sweep: bool = True) -> dict:
+    ctx = resolve_context(ctx)
+    X_train, X_test, y_train, y_test = ctx.data
+    model = ctx.model
+    y_clean = ctx.predict("test")
     acc_clean = float(accuracy_score(y_test, y_clean))
     X_fgsm = generate_fgsm(model, X_test, epsilon=0.1)
     X_pgd = generate_pgd(model, X_test, epsilon=0.2, alpha=0.05, num_iter=5)
@@ -60,18 +232,30 @@ def run_adversarial_tests() -> dict:
         "accuracy_pgd": acc_pgd,
         "robustness_score": robustness_score,
     }
+    scalars = dict(metrics)
+    if sweep:
+        metrics["sweep"] = robustness_sweep(model, X_test, y_test)
+        scalars["aurc_fgsm"] = metrics["sweep"]["fgsm"]["aurc"]
+        scalars["aurc_pgd"] = min(curve["aurc"] for curve in metrics["sweep"]["pgd"].values())
+    if is_linear_binary(model):
+        metrics["certified"] = certified_robustness(model, (X_test, y_test))
+        for norm in DUAL_NORMS:
+            scalars[f"median_distance_{norm}"] = metrics["certified"][norm]["median_distance"]
     path = REPORTS_DIR / "adversarial_metrics.json"
     save_json(path, metrics)
-    configure_mlflow()
-    with mlflow.start_run(run_name="adversarial_tests"):
-        for k, v in metrics.items():
+    ctx.configure_mlflow()
+    with ctx.start_run(run_name="adversarial_tests"):
+        for k, v in scalars.items():
             mlflow.log_metric(k, v)
         mlflow.log_artifact(str(path), artifact_path="adversarial")
     return metrics
 
 
 def main() -> None:
-    run_adversarial_tests()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--no-sweep", action="store_true", help="Only run the fixed FGSM/PGD settings.")
+    args = parser.parse_args()
+    run_adversarial_tests(sweep=not args.no_sweep)
 
 
 if __name__ == "__main__":
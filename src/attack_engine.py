@@ -0,0 +1,163 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+FD_STEP = 1e-3
+# Bounds the (rows, 2 * features, features) probe block of one finite-difference call.
+_FD_BLOCK_ELEMENTS = 1 << 24
+_PGD_CHUNK_SIZE = 4096
+_PROBA_EPS = 1e-12
+
+
+def is_linear_binary(model) -> bool:
+    return hasattr(model, "coef_") and np.ndim(model.coef_) == 2 and model.coef_.shape[0] == 1
+
+
+def has_analytic_gradient(model) -> bool:
+    return hasattr(model, "input_gradient") or is_linear_binary(model)
+
+
+def _frame(rows: np.ndarray, columns) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=columns)
+
+
+def class1_score(model, X: np.ndarray, columns=None) -> np.ndarray:
+    """
+    Class-1 score: the binary ``decision_function`` when there is one, since
+    it does not saturate, else log-odds from ``predict_proba``.
+    """
+    if hasattr(model, "decision_function"):
+        scores = np.asarray(model.decision_function(_frame(X, columns)), dtype=float)
+        if scores.ndim == 1:
+            return scores
+    p = model.predict_proba(_frame(X, columns))[:, 1]
+    p = np.clip(p, _PROBA_EPS, 1 - _PROBA_EPS)
+    return np.log(p) - np.log1p(-p)
+
+
+def finite_difference_gradient(model, X, columns=None, step: float = FD_STEP) -> np.ndarray:
+    """
+    Central differences of the class-1 score for every row and feature.
+    All +/- probes of a block of rows are scored in one model call; the step is relative to each value's magnitude.
+    """
+    X = np.asarray(X, dtype=float)
+    n, d = X.shape
+    grad = np.empty((n, d))
+    signs = np.concatenate([np.eye(d), -np.eye(d)])
+    rows = max(1, _FD_BLOCK_ELEMENTS // (2 * d * d))
+    for start in range(0, n, rows):
+        block = X[start:start + rows]
+        h = step * np.maximum(1.0, np.abs(block))
+        probes = block[:, None, :] + signs[None] * h[:, None, :]
+        scores = class1_score(model, probes.reshape(-1, d), columns).reshape(len(block), 2, d)
+        grad[start:start + rows] = (scores[:, 0] - scores[:, 1]) / (2 * h)
+    return grad
+
+
+def input_gradient(model, X, columns=None) -> np.ndarray:
+    """
+    Gradient of the class-1 score with respect to the inputs. Uses the
+    model's ``input_gradient`` when it has one, the weights of a binary
+    linear model, and finite differences otherwise.
+    """
+    X = np.asarray(X, dtype=float)
+    if hasattr(model, "input_gradient"):
+        return np.asarray(model.input_gradient(X), dtype=float)
+    if is_linear_binary(model):
+        return np.broadcast_to(model.coef_[0].astype(float), X.shape)
+    return finite_difference_gradient(model, X, columns)
+
+
+def attack_direction(model, X, y=None, columns=None) -> np.ndarray:
+    """
+    Sign of the input gradient: towards class 1, or away from each row's
+    true label when ``y`` is given.
+    """
+    direction = np.sign(input_gradient(model, X, columns))
+    if y is None:
+        return direction
+    return -(2 * np.asarray(y, dtype=float)[:, None] - 1) * direction
+
+
+def _true_class_proba(model, X: np.ndarray, y: np.ndarray, columns) -> np.ndarray:
+    p = model.predict_proba(_frame(X, columns))[:, 1]
+    return np.where(y == 1, p, 1 - p)
+
+
+def _pgd_chunk(model, X, y, epsilon, alpha, num_iter, restarts, seed, columns) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    # Without labels, push towards class 1 as the fixed-step attacks always have.
+    score_y = np.zeros(len(X)) if y is None else y
+    best, best_p = None, None
+    for restart in range(restarts + 1):
+        X_adv = X if restart == 0 else X + rng.uniform(-epsilon, epsilon, X.shape)
+        for _ in range(num_iter):
+            step = alpha * attack_direction(model, X_adv, y, columns)
+            X_adv = X + np.clip(X_adv + step - X, -epsilon, epsilon)
+        if restarts == 0:
+            return X_adv
+        p = _true_class_proba(model, X_adv, score_y, columns)
+        if best is None:
+            best, best_p = X_adv.copy(), p
+        else:
+            better = p < best_p
+            best[better] = X_adv[better]
+            best_p[better] = p[better]
+    return best
+
+
+def pgd_attack(
+    model,
+    X,
+    y=None,
+    epsilon: float = 0.2,
+    alpha: float = 0.05,
+    num_iter: int = 5,
+    restarts: int = 0,
+    seed: int = 0,
+    max_workers: Optional[int] = 1,
+    columns: Optional[Sequence[str]] = None,
+    chunk_size: int = _PGD_CHUNK_SIZE,
+) -> np.ndarray:
+    """
+    L-inf PGD with a gradient step per sample and iteration. Each restart
+    after the first starts from a uniform point in the epsilon ball, and the
+    example that lowers the true-class probability most is kept per row.
+    Row chunks are attacked in a process pool when ``max_workers`` > 1;
+    seeds are per chunk, so results do not depend on the worker count.
+    """
+    if columns is None and hasattr(X, "columns"):
+        columns = list(X.columns)
+    X = np.asarray(X, dtype=float)
+    y = None if y is None else np.asarray(y)
+    starts = list(range(0, len(X), chunk_size))
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    tasks = [
+        (
+            X[start:start + chunk_size],
+            None if y is None else y[start:start + chunk_size],
+            epsilon,
+            alpha,
+            num_iter,
+            restarts,
+            chunk_seed,
+            columns,
+        )
+        for start, chunk_seed in zip(starts, seeds)
+    ]
+    if not tasks:
+        return X.copy()
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(tasks)))
+    if max_workers == 1:
+        results = [_pgd_chunk(model, *task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers) as pool:
+            futures = [pool.submit(_pgd_chunk, model, *task) for task in tasks]
+            results = [future.result() for future in futures]
+    return np.concatenate(results)
@@ -0,0 +1,178 @@
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import mlflow
+
+from src.linear_scorer import LinearScorer, load_linear_scorer
+from src.model_registry import resolve_model_path
+from src.utils import (
+    DEFAULT_CHUNK_SIZE,
+    MODELS_DIR,
+    REPORTS_DIR,
+    TARGET_COL,
+    configure_mlflow,
+    ensure_dir,
+    iter_data_chunks,
+    load_model,
+    save_json,
+)
+
+
+OUTPUT_HEADER = "prediction,probability\n"
+
+_worker_model = None
+_worker_arrays: Dict[str, np.ndarray] = {}
+
+
+def load_scoring_model(model_path: Path):
+    """The exported linear scorer for ``model_path`` when current, else the pickled model."""
+    return load_linear_scorer(model_path) or load_model(model_path)
+
+
+def _init_worker(model_path: str) -> None:
+    global _worker_model
+    _worker_model = load_scoring_model(Path(model_path))
+
+
+def _rows(block) -> np.ndarray:
+    kind, payload = block
+    if kind == "npy":
+        # Workers map the file themselves, so only row bounds cross the process boundary.
+        path, start, end = payload
+        if path not in _worker_arrays:
+            _worker_arrays[path] = np.load(path, mmap_mode="r")
+        return np.asarray(_worker_arrays[path][start:end], dtype=float)
+    return payload
+
+
+def score_block(block, model=None) -> bytes:
+    """Score one block of rows and return its CSV lines."""
+    model = model if model is not None else _worker_model
+    X = _rows(block)
+    if isinstance(model, LinearScorer):
+        proba = model.predict_proba(X)
+    else:
+        columns = getattr(model, "feature_names_in_", None)
+        proba = model.predict_proba(pd.DataFrame(X, columns=columns))
+    out = pd.DataFrame({"prediction": model.classes_[np.argmax(proba, axis=1)], "probability": proba[:, 1]})
+    return out.to_csv(index=False, header=False).encode("utf-8")
+
+
+def iter_blocks(source: str, chunk_size: int = None, columns=None) -> Iterator[Tuple[Tuple[str, object], int]]:
+    """
+    (block, n_rows) pairs over ``source``: a stored split name ("train" or
+    "test"), a 2-D ``.npy`` array, or a CSV file. A label column is ignored.
+    """
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    if source in ("train", "test"):
+        for X, _ in iter_data_chunks(source, chunk_size):
+            yield ("rows", X.to_numpy()), len(X)
+    elif str(source).endswith(".npy"):
+        n_rows = len(np.load(source, mmap_mode="r"))
+        for start in range(0, n_rows, chunk_size):
+            end = min(start + chunk_size, n_rows)
+            yield ("npy", (str(source), start, end)), end - start
+    else:
+        for chunk in pd.read_csv(source, chunksize=chunk_size):
+            chunk = chunk.drop(columns=[TARGET_COL], errors="ignore")
+            if columns is not None:
+                chunk = chunk[columns]
+            yield ("rows", chunk.to_numpy(dtype=float)), len(chunk)
+
+
+def batch_score(
+    source: str,
+    output: Path,
+    model_path: Path = None,
+    chunk_size: int = None,
+    max_workers: Optional[int] = None,
+    max_pending: Optional[int] = None,
+) -> dict:
+    """
+    Stream ``source`` through the model in chunks and write one
+    "prediction,probability" line per input row to ``output``, in input
+    order. Chunks are scored in a process pool; at most ``max_pending``
+    chunks (default twice the workers) are in flight, which bounds memory.
+    """
+    if model_path is None:
+        model_path = MODELS_DIR / "model.pkl"
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, max_workers)
+    if max_pending is None:
+        max_pending = 2 * max_workers
+    model = load_scoring_model(model_path)
+    columns = getattr(model, "feature_names_in_", None)
+    blocks = iter_blocks(source, chunk_size, None if columns is None else list(columns))
+
+    output = Path(output)
+    ensure_dir(output.parent)
+    n_rows = 0
+    start_time = time.perf_counter()
+    with output.open("wb") as f:
+        f.write(OUTPUT_HEADER.encode("utf-8"))
+        if max_workers == 1:
+            for block, rows in blocks:
+                f.write(score_block(block, model))
+                n_rows += rows
+        else:
+            with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(str(model_path),)) as pool:
+                pending = deque()
+                for block, rows in blocks:
+                    if len(pending) >= max_pending:
+                        f.write(pending.popleft().result())
+                    pending.append(pool.submit(score_block, block))
+                    n_rows += rows
+                while pending:
+                    f.write(pending.popleft().result())
+    seconds = time.perf_counter() - start_time
+    metrics = {
+        "source": str(source),
+        "output": str(output),
+        "rows": n_rows,
+        "seconds": seconds,
+        "rows_per_second": n_rows / seconds if seconds > 0 else 0.0,
+        "max_workers": max_workers,
+        "scorer": type(model).__name__,
+    }
+    save_json(REPORTS_DIR / "batch_score.json", metrics)
+    configure_mlflow()
+    with mlflow.start_run(run_name="batch_score"):
+        mlflow.log_metric("rows", n_rows)
+        mlflow.log_metric("rows_per_second", metrics["rows_per_second"])
+        mlflow.log_param("scorer", metrics["scorer"])
+    return metrics
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Score a CSV, .npy array or stored split with the trained model.")
+    parser.add_argument("source", help='CSV file, 2-D .npy array, or "train"/"test".')
+    parser.add_argument("output", help="Output CSV of prediction,probability in input order.")
+    parser.add_argument("--model", type=str, default=None, help="Model pickle, or an MLflow model or run ID under mlruns/.")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    model_path = None
+    if args.model is not None:
+        model_path = Path(args.model)
+        if not model_path.is_file():
+            model_path = resolve_model_path(args.model)
+    metrics = batch_score(
+        args.source,
+        args.output,
+        model_path=model_path,
+        chunk_size=args.chunk_size,
+        max_workers=args.workers,
+    )
+    print(f"Scored {metrics['rows']} rows in {metrics['seconds']:.1f}s ({metrics['rows_per_second']:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
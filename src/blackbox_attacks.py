@@ -0,0 +1,341 @@
+import argparse
+import asyncio
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import mlflow
+
+from src.context import PipelineContext, resolve_context
+from src.utils import (
+    save_json,
+    REPORTS_DIR,
+)
+
+
+QUERY_BUDGETS = (10, 25, 50, 100, 250, 500, 1000)
+
+
+class ModelOracle:
+    """Query access to an in-process model; every scored row counts as one query."""
+
+    def __init__(self, model, columns: Optional[Sequence[str]] = None):
+        self.model = model
+        self.columns = None if columns is None else list(columns)
+        self.queries = 0
+
+    @property
+    def target(self) -> str:
+        return "in-process"
+
+    def _frame(self, X: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(X, columns=self.columns)
+
+    def proba(self, X: np.ndarray) -> np.ndarray:
+        self.queries += len(X)
+        return np.asarray(self.model.predict_proba(self._frame(X))[:, 1], dtype=float)
+
+    def label(self, X: np.ndarray) -> np.ndarray:
+        self.queries += len(X)
+        return np.asarray(self.model.predict(self._frame(X))).astype(int)
+
+
+class HTTPOracle:
+    """
+    Query access to a scoring endpoint. Rows are posted as
+    ``{"instances": [[...], ...]}`` in batches sent concurrently through one
+    async client; the response carries "probabilities" and "predictions".
+    """
+
+    def __init__(
+        self,
+        url: str,
+        batch_size: int = 256,
+        concurrency: int = 8,
+        timeout: float = 30.0,
+    ):
+        self.url = url
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.queries = 0
+
+    @property
+    def target(self) -> str:
+        return self.url
+
+    async def _score(self, X: np.ndarray) -> Dict[str, np.ndarray]:
+        import httpx
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def post(client, rows):
+            async with semaphore:
+                response = await client.post(self.url, json={"instances": rows.tolist()})
+                response.raise_for_status()
+                return response.json()
+
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            batches = [X[i:i + self.batch_size] for i in range(0, len(X), self.batch_size)]
+            results = await asyncio.gather(*(post(client, rows) for rows in batches))
+        return {
+            "probabilities": np.concatenate([np.asarray(r["probabilities"], dtype=float) for r in results]),
+            "predictions": np.concatenate([np.asarray(r["predictions"]).astype(int) for r in results]),
+        }
+
+    def _request(self, X: np.ndarray) -> Dict[str, np.ndarray]:
+        self.queries += len(X)
+        if len(X) == 0:
+            return {"probabilities": np.empty(0), "predictions": np.empty(0, dtype=int)}
+        return asyncio.run(self._score(np.asarray(X, dtype=float)))
+
+    def proba(self, X: np.ndarray) -> np.ndarray:
+        return self._request(X)["probabilities"]
+
+    def label(self, X: np.ndarray) -> np.ndarray:
+        return self._request(X)["predictions"]
+
+
+def _scale(X: np.ndarray, scale=None) -> np.ndarray:
+    if scale is None:
+        scale = X.std(axis=0)
+    scale = np.asarray(scale, dtype=float).copy()
+    scale[scale == 0] = 1.0
+    return scale
+
+
+def simba_attack(
+    oracle,
+    X,
+    y,
+    epsilon: float = 0.5,
+    max_queries: int = 1000,
+    scale=None,
+    seed: int = 0,
+) -> Dict[str, np.ndarray]:
+    """
+    SimBA with the Cartesian basis, run on every sample at once. Each step
+    tries -epsilon, then +epsilon (in units of ``scale``), along the sample's
+    next random coordinate and keeps the change if the true-class
+    probability drops. Returns the adversarial rows and, per sample, the
+    queries spent when it was first misclassified (-1 if never).
+    """
+    rng = np.random.default_rng(seed)
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y).astype(int)
+    n, d = X.shape
+    step = epsilon * _scale(X, scale)
+    X_adv = X.copy()
+    p = oracle.proba(X_adv)
+    p_true = np.where(y == 1, p, 1 - p)
+    queries = np.ones(n, dtype=np.int64)
+    success_at = np.where(p_true < 0.5, queries, -1)
+    order = np.argsort(rng.random((n, d)), axis=1)
+    for t in range(d):
+        active = np.flatnonzero((success_at < 0) & (queries + 2 <= max_queries))
+        if active.size == 0:
+            break
+        coord = order[active, t]
+        for sign in (-1.0, 1.0):
+            if active.size == 0:
+                break
+            candidate = X_adv[active].copy()
+            candidate[np.arange(active.size), coord] += sign * step[coord]
+            p = oracle.proba(candidate)
+            candidate_true = np.where(y[active] == 1, p, 1 - p)
+            queries[active] += 1
+            better = candidate_true < p_true[active]
+            improved = active[better]
+            X_adv[improved] = candidate[better]
+            p_true[improved] = candidate_true[better]
+            newly = improved[p_true[improved] < 0.5]
+            success_at[newly] = queries[newly]
+            # Only coordinates where -epsilon did not help are tried with +epsilon.
+            active, coord = active[~better], coord[~better]
+    return {"X_adv": X_adv, "success_at": success_at, "queries": queries}
+
+
+class _ScaledOracle:
+    """Labels rows given in units of ``scale``; the wrapped oracle sees raw rows."""
+
+    def __init__(self, oracle, scale: np.ndarray):
+        self.oracle = oracle
+        self.scale = scale
+
+    def label(self, Z: np.ndarray) -> np.ndarray:
+        return self.oracle.label(Z * self.scale)
+
+
+def _boundary_search(oracle, x, x_adv, y, queries, steps: int) -> np.ndarray:
+    """Binary search on the segment x -> x_adv for the closest adversarial point."""
+    lo = np.zeros(len(x))
+    hi = np.ones(len(x))
+    for _ in range(steps):
+        mid = (lo + hi) / 2
+        adversarial = oracle.label(x + mid[:, None] * (x_adv - x)) != y
+        queries += 1
+        hi = np.where(adversarial, mid, hi)
+        lo = np.where(adversarial, lo, mid)
+    return x + hi[:, None] * (x_adv - x)
+
+
+def hopskipjump_attack(
+    oracle,
+    X,
+    y,
+    epsilon: float = 1.0,
+    max_queries: int = 1000,
+    scale=None,
+    grad_queries: int = 50,
+    max_grad_queries: int = 200,
+    search_steps: int = 10,
+    seed: int = 0,
+) -> Dict[str, np.ndarray]:
+    """
+    Decision-based L2 attack in the style of HopSkipJump, using labels only
+    and run on every sample at once. Each sample starts from a row of the
+    batch with a different label, is moved to the decision boundary by
+    binary search, then repeatedly steps along a Monte Carlo estimate of the
+    boundary normal. Success means an adversarial point within ``epsilon``
+    (L2, in units of ``scale``); ``success_at`` holds the queries spent when
+    that first held (-1 if never).
+    """
+    rng = np.random.default_rng(seed)
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y).astype(int)
+    n, d = X.shape
+    scale = _scale(X, scale)
+    queries = np.ones(n, dtype=np.int64)
+    labels = oracle.label(X)
+    success_at = np.where(labels != y, queries, -1)
+    scaled = _ScaledOracle(oracle, scale)
+    Z = X / scale
+    Z_adv = Z.copy()
+    distance = np.zeros(n)
+    # Start from a random batch row whose label differs from the sample's label.
+    candidates = [np.flatnonzero(labels != label) for label in range(2)]
+    active = np.flatnonzero(success_at < 0)
+    has_start = np.array([candidates[y[i]].size > 0 for i in active], dtype=bool)
+    active = active[has_start]
+    if active.size:
+        starts = np.array([rng.choice(candidates[y[i]]) for i in active])
+        sub_queries = queries[active]
+        Z_adv[active] = _boundary_search(scaled, Z[active], Z[starts], y[active], sub_queries, search_steps)
+        queries[active] = sub_queries
+        distance[active] = np.linalg.norm(Z_adv[active] - Z[active], axis=1)
+        reached = active[distance[active] <= epsilon]
+        success_at[reached] = queries[reached]
+    iteration = 0
+    while True:
+        iteration += 1
+        n_grad = min(int(grad_queries * np.sqrt(iteration)), max_grad_queries)
+        cost = n_grad + 2 * search_steps
+        active = active[(success_at[active] < 0) & (queries[active] + cost <= max_queries)]
+        if active.size == 0:
+            break
+        z, z_b, y_a = Z[active], Z_adv[active], y[active]
+        dist = distance[active]
+        # Gradient direction at the boundary point from random probes.
+        delta = np.sqrt(d) * 1e-3 * np.maximum(dist, 1e-6)
+        u = rng.normal(size=(active.size, n_grad, d))
+        u /= np.linalg.norm(u, axis=2, keepdims=True)
+        probes = z_b[:, None, :] + delta[:, None, None] * u
+        phi = np.where(scaled.label(probes.reshape(-1, d)).reshape(active.size, n_grad) != y_a[:, None], 1.0, -1.0)
+        queries[active] += n_grad
+        centred = phi - phi.mean(axis=1, keepdims=True)
+        centred = np.where(np.all(centred == 0, axis=1, keepdims=True), phi, centred)
+        v = np.einsum("ij,ijk->ik", centred, u)
+        v /= np.maximum(np.linalg.norm(v, axis=1, keepdims=True), 1e-12)
+        # Geometric step along the estimated normal, halved until adversarial.
+        step = dist / np.sqrt(iteration)
+        candidate = z_b.copy()
+        pending = np.arange(active.size)
+        for _ in range(search_steps):
+            if pending.size == 0:
+                break
+            trial = z_b[pending] + step[pending, None] * v[pending]
+            adversarial = scaled.label(trial) != y_a[pending]
+            queries[active[pending]] += 1
+            candidate[pending[adversarial]] = trial[adversarial]
+            step[pending[~adversarial]] /= 2
+            pending = pending[~adversarial]
+        sub_queries = queries[active]
+        Z_adv[active] = _boundary_search(scaled, z, candidate, y_a, sub_queries, search_steps)
+        queries[active] = sub_queries
+        distance[active] = np.linalg.norm(Z_adv[active] - z, axis=1)
+        reached = active[distance[active] <= epsilon]
+        success_at[reached] = queries[reached]
+    return {"X_adv": Z_adv * scale, "success_at": success_at, "queries": queries, "distance": distance}
+
+
+def success_curve(success_at: np.ndarray, attackable: np.ndarray, budgets: Sequence[int] = QUERY_BUDGETS) -> Dict:
+    """Share of initially correct samples fooled within each query budget."""
+    hits = success_at[attackable]
+    hits = hits[hits >= 0]
+    total = int(attackable.sum())
+    rates = [float(np.sum(hits <= b) / total) if total else 0.0 for b in budgets]
+    return {
+        "budgets": list(budgets),
+        "success_rate": rates,
+        "median_queries": float(np.median(hits)) if hits.size else None,
+        "attacked": total,
+    }
+
+
+def run_blackbox_attacks(
+    ctx: PipelineContext = None,
+    endpoint: Optional[str] = None,
+    n_samples: int = 200,
+    max_queries: int = max(QUERY_BUDGETS),
+    seed: int = 42,
+) -> dict:
+    """
+    Attack a sample of the test split through query access only, either to
+    the in-process model or to ``endpoint``, and report success rate vs
+    query budget for each attack.
+    """
+    ctx = resolve_context(ctx)
+    X_test, y_test = ctx.split("test")
+    rng = np.random.default_rng(seed)
+    idx = np.sort(rng.choice(len(X_test), min(n_samples, len(X_test)), replace=False))
+    X = X_test.to_numpy(dtype=float)[idx]
+    y = np.asarray(y_test)[idx].astype(int)
+    scale = _scale(X_test.to_numpy(dtype=float))
+    if endpoint is None:
+        oracle = ModelOracle(ctx.model, columns=X_test.columns)
+    else:
+        oracle = HTTPOracle(endpoint)
+    attackable = oracle.label(X) == y
+    metrics = {"target": oracle.target, "n_samples": int(len(X)), "max_queries": max_queries}
+    attacks = {
+        "simba": lambda: simba_attack(oracle, X, y, max_queries=max_queries, scale=scale, seed=seed),
+        "hopskipjump": lambda: hopskipjump_attack(oracle, X, y, max_queries=max_queries, scale=scale, seed=seed),
+    }
+    for name, attack in attacks.items():
+        before = oracle.queries
+        result = attack()
+        metrics[name] = success_curve(result["success_at"], attackable)
+        metrics[name]["queries_total"] = int(oracle.queries - before)
+    path = REPORTS_DIR / "blackbox_metrics.json"
+    save_json(path, metrics)
+    ctx.configure_mlflow()
+    with ctx.start_run(run_name="blackbox_attacks"):
+        mlflow.log_param("target", metrics["target"])
+        for name in attacks:
+            mlflow.log_metric(f"{name}_success_rate", metrics[name]["success_rate"][-1])
+            mlflow.log_metric(f"{name}_queries_total", metrics[name]["queries_total"])
+        mlflow.log_artifact(str(path), artifact_path="adversarial")
+    return metrics
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoint", type=str, default=None, help="Scoring endpoint URL; defaults to the local model.")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--max-queries", type=int, default=max(QUERY_BUDGETS))
+    args = parser.parse_args()
+    run_blackbox_attacks(endpoint=args.endpoint, n_samples=args.samples, max_queries=args.max_queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+import argparse
+import math
+from collections import deque
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+import mlflow
+
+from src.context import PipelineContext, resolve_context
+from src.utils import (
+    DEFAULT_CHUNK_SIZE,
+    REPORTS_DIR,
+    TARGET_COL,
+    load_json,
+    save_json,
+)
+
+
+class PageHinkley:
+    """
+    Two-sided Page-Hinkley test for a change in the mean of a stream.
+    Keeps a handful of running sums, so memory and per-event cost are O(1).
+    """
+
+    def __init__(
+        self,
+        delta: float = 0.005,
+        threshold: float = 50.0,
+        alpha: float = 0.9999,
+        min_instances: int = 30,
+    ):
+        self.delta = delta
+        self.threshold = threshold
+        self.alpha = alpha
+        self.min_instances = min_instances
+        self.reset()
+
+    def reset(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.sum_up = 0.0
+        self.sum_down = 0.0
+        self.min_up = 0.0
+        self.max_down = 0.0
+
+    def update(self, x: float) -> bool:
+        self.n += 1
+        self.mean += (x - self.mean) / self.n
+        self.sum_up = self.alpha * self.sum_up + (x - self.mean - self.delta)
+        self.sum_down = self.alpha * self.sum_down + (x - self.mean + self.delta)
+        self.min_up = min(self.min_up, self.sum_up)
+        self.max_down = max(self.max_down, self.sum_down)
+        if self.n < self.min_instances:
+            return False
+        if self.sum_up - self.min_up > self.threshold or self.max_down - self.sum_down > self.threshold:
+            self.reset()
+            return True
+        return False
+
+    @property
+    def estimation(self) -> float:
+        return self.mean
+
+
+class ADWIN:
+    """
+    ADaptive WINdowing (ADWIN2) change detector. The window is kept as an
+    exponential histogram of at most ``max_buckets`` buckets per size; a cut
+    is searched for every ``clock`` events and the older part of the window
+    is dropped while the means of both parts differ significantly.
+    ``max_window`` caps the window so memory stays bounded on endless streams.
+    """
+
+    def __init__(
+        self,
+        delta: float = 0.002,
+        max_buckets: int = 5,
+        clock: int = 32,
+        min_window: int = 5,
+        max_window: int = 1 << 20,
+    ):
+        self.delta = delta
+        self.max_buckets = max_buckets
+        self.clock = clock
+        self.min_window = min_window
+        self.max_window = max_window
+        # rows[i] holds (count, total, variance) buckets of 2 ** i events, oldest first.
+        self.rows: List[deque] = [deque()]
+        self.width = 0
+        self.total = 0.0
+        self.variance = 0.0
+        self.ticks = 0
+
+    @property
+    def estimation(self) -> float:
+        return self.total / self.width if self.width else 0.0
+
+    def _insert(self, count: float, total: float, variance: float) -> None:
+        if self.width:
+            mean = self.total / self.width
+            self.variance += variance + self.width * count / (self.width + count) * (total / count - mean) ** 2
+        else:
+            self.variance += variance
+        self.width += count
+        self.total += total
+
+    def _drop_oldest(self) -> None:
+        while not self.rows[-1]:
+            self.rows.pop()
+        count, total, variance = self.rows[-1].popleft()
+        self.width -= count
+        self.total -= total
+        if self.width:
+            mean = self.total / self.width
+            self.variance -= variance + self.width * count / (self.width + count) * (total / count - mean) ** 2
+            self.variance = max(self.variance, 0.0)
+        else:
+            self.total = 0.0
+            self.variance = 0.0
+        while len(self.rows) > 1 and not self.rows[-1]:
+            self.rows.pop()
+
+    def _compress(self) -> None:
+        for i, row in enumerate(self.rows):
+            if len(row) <= self.max_buckets:
+                break
+            n1, t1, v1 = row.popleft()
+            n2, t2, v2 = row.popleft()
+            count = n1 + n2
+            merged = (count, t1 + t2, v1 + v2 + n1 * n2 / count * (t1 / n1 - t2 / n2) ** 2)
+            if i + 1 == len(self.rows):
+                self.rows.append(deque())
+            # Buckets leaving row i are newer than everything in row i + 1.
+            self.rows[i + 1].append(merged)
+
+    def _cut_found(self) -> bool:
+        if self.width < 2 * self.min_window:
+            return False
+        log_term = math.log(2.0 * math.log(self.width) / self.delta)
+        var = self.variance / self.width
+        n0, t0 = 0.0, 0.0
+        for row in reversed(self.rows):
+            for count, total, _ in row:
+                n0 += count
+                t0 += total
+                n1 = self.width - n0
+                if n1 < self.min_window:
+                    return False
+                if n0 < self.min_window:
+                    continue
+                m = 1.0 / (1.0 / n0 + 1.0 / n1)
+                eps = math.sqrt(2.0 * var * log_term / m) + 2.0 * log_term / (3.0 * m)
+                if abs(t0 / n0 - (self.total - t0) / n1) > eps:
+                    return True
+        return False
+
+    def update(self, x: float) -> bool:
+        x = float(x)
+        self.rows[0].append((1, x, 0.0))
+        self._insert(1, x, 0.0)
+        self._compress()
+        while self.width > self.max_window:
+            self._drop_oldest()
+        self.ticks += 1
+        if self.ticks % self.clock:
+            return False
+        detected = False
+        while self._cut_found():
+            self._drop_oldest()
+            detected = True
+        return detected
+
+
+DETECTORS = {"adwin": ADWIN, "page_hinkley": PageHinkley}
+
+
+class ConceptDriftMonitor:
+    """
+    Online change detection over the model's output stream: the predicted
+    probability of every event and, once labels arrive, its 0/1 error.
+    Every stream is watched by each detector in ``detectors``.
+    """
+
+    def __init__(self, detectors: Iterable[str] = tuple(DETECTORS), max_alerts: int = 1000):
+        self.detector_names = list(detectors)
+        unknown = [name for name in self.detector_names if name not in DETECTORS]
+        if unknown:
+            raise ValueError(f"Unknown concept drift detectors: {', '.join(unknown)}")
+        self.detectors = {
+            stream: {name: DETECTORS[name]() for name in self.detector_names}
+            for stream in ("proba", "error")
+        }
+        self.counts = {"proba": 0, "error": 0}
+        self.alerts = deque(maxlen=max_alerts)
+        self.n_alerts = {stream: {name: 0 for name in self.detector_names} for stream in self.detectors}
+        self.events = 0
+
+    def _feed(self, stream: str, value: float) -> List[dict]:
+        self.counts[stream] += 1
+        alerts = []
+        for name, detector in self.detectors[stream].items():
+            if detector.update(value):
+                alert = {
+                    "event": self.events,
+                    "stream": stream,
+                    "detector": name,
+                    "estimate": float(detector.estimation),
+                }
+                self.n_alerts[stream][name] += 1
+                self.alerts.append(alert)
+                alerts.append(alert)
+        return alerts
+
+    def update(self, proba: float, y_true: Optional[int] = None, y_pred: Optional[int] = None) -> List[dict]:
+        """Feed one event; returns the alerts it raised."""
+        alerts = self._feed("proba", proba)
+        if y_true is not None:
+            if y_pred is None:
+                y_pred = int(proba >= 0.5)
+            alerts += self._feed("error", float(y_pred != y_true))
+        self.events += 1
+        return alerts
+
+    def update_many(self, proba, y_true=None, y_pred=None) -> List[dict]:
+        proba = np.asarray(proba, dtype=float)
+        labels = [None] * len(proba) if y_true is None else np.asarray(y_true).tolist()
+        preds = [None] * len(proba) if y_pred is None else np.asarray(y_pred).tolist()
+        alerts = []
+        for p, t, y in zip(proba.tolist(), labels, preds):
+            alerts += self.update(p, t, y)
+        return alerts
+
+    def summary(self) -> dict:
+        streams = {}
+        for stream, detectors in self.detectors.items():
+            streams[stream] = {
+                "events": self.counts[stream],
+                "detections": dict(self.n_alerts[stream]),
+                "estimate": {name: float(detector.estimation) for name, detector in detectors.items()},
+                "drift_detected": any(self.n_alerts[stream].values()),
+            }
+        return {
+            "events": self.events,
+            "detectors": self.detector_names,
+            "streams": streams,
+            "alerts": list(self.alerts),
+            "drift_detected": any(stream["drift_detected"] for stream in streams.values()),
+        }
+
+
+def _baseline_events():
+    data = load_json(REPORTS_DIR / "baseline_predictions.json")
+    return [(data["y_proba"], data.get("y_true"), data.get("y_pred"))]
+
+
+def _stream_events(model, path: str, chunk_size: int = None):
+    for chunk in pd.read_csv(path, chunksize=chunk_size or DEFAULT_CHUNK_SIZE):
+        y_true = chunk[TARGET_COL].to_numpy() if TARGET_COL in chunk else None
+        X = chunk.drop(columns=[TARGET_COL], errors="ignore")
+        yield model.predict_proba(X)[:, 1], y_true, None
+
+
+def monitor_concept_drift(
+    ctx: PipelineContext = None,
+    events=None,
+    detectors: Iterable[str] = tuple(DETECTORS),
+) -> dict:
+    """
+    Run the online detectors over ``events``: an iterable of
+    (y_proba, y_true, y_pred) batches where labels may be None. Defaults to
+    the test-set predictions written by ``evaluate``.
+    """
+    ctx = resolve_context(ctx)
+    if events is None:
+        events = _baseline_events()
+    monitor = ConceptDriftMonitor(detectors)
+    for proba, y_true, y_pred in events:
+        monitor.update_many(proba, y_true, y_pred)
+    summary = monitor.summary()
+    path = REPORTS_DIR / "concept_drift.json"
+    save_json(path, summary)
+    ctx.configure_mlflow()
+    with ctx.start_run(run_name="concept_drift"):
+        mlflow.log_metric("events", summary["events"])
+        for stream, result in summary["streams"].items():
+            for name, count in result["detections"].items():
+                mlflow.log_metric(f"{stream}_{name}_detections", count)
+        mlflow.log_param("drift_detected", str(summary["drift_detected"]))
+        mlflow.log_artifact(str(path), artifact_path="concept_drift")
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--stream",
+        type=str,
+        default=None,
+        help="CSV of production rows to score and monitor; a label column enables error-rate detection.",
+    )
+    parser.add_argument("--detectors", nargs="+", choices=list(DETECTORS), default=list(DETECTORS))
+    args = parser.parse_args()
+    ctx = PipelineContext()
+    events = None if args.stream is None else _stream_events(ctx.model, args.stream)
+    monitor_concept_drift(ctx, events=events, detectors=args.detectors)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.prediction_cache import cached_predict
+from src.utils import (
+    MODELS_DIR,
+    configure_mlflow,
+    dataset_hash,
+    hash_file,
+    load_model,
+    load_train_test_data,
+    resolve_dtype,
+)
+
+
+SPLITS = ("train", "test")
+
+
+@dataclass
+class PipelineContext:
+    """
+    State shared by pipeline stages running in one interpreter.
+    Data, model, predictions and MLflow configuration are loaded lazily
+    and at most once; stages called without a context get a fresh one.
+    ``n_jobs`` is the worker budget the scheduler grants each stage for its
+    own pools; None means every core.
+    """
+
+    dtype: Optional[str] = None
+    n_jobs: Optional[int] = None
+    _data: Optional[Tuple] = field(default=None, repr=False)
+    _data_hash: Optional[str] = field(default=None, repr=False)
+    _model: Any = field(default=None, repr=False)
+    _model_hash: Optional[str] = field(default=None, repr=False)
+    _predictions: Dict[Tuple[str, str], np.ndarray] = field(default_factory=dict, repr=False)
+    _mlflow_client: Any = field(default=None, repr=False)
+    _mlflow_configured: bool = field(default=False, repr=False)
+    _runs: Dict[int, List[str]] = field(default_factory=dict, repr=False)
+
+    @property
+    def data(self) -> Tuple:
+        if self._data is None:
+            self._data = load_train_test_data(dtype=self.dtype)
+            self._data_hash = dataset_hash()
+        return self._data
+
+    @property
+    def model(self):
+        if self._model is None:
+            path = MODELS_DIR / "model.pkl"
+            self._model = load_model(path)
+            self._model_hash = hash_file(path)
+        return self._model
+
+    def set_model(self, model, path=None) -> None:
+        """
+        Replace the model. Pass the file it was saved to so its predictions
+        can be shared through the on-disk prediction cache.
+        """
+        self._model = model
+        self._model_hash = hash_file(path) if path is not None else None
+        self._predictions.clear()
+
+    def split(self, name: str):
+        if name not in SPLITS:
+            raise ValueError(f"Unknown split: {name}")
+        X_train, X_test, y_train, y_test = self.data
+        if name == "train":
+            return X_train, y_train
+        return X_test, y_test
+
+    def predict(self, split: str, method: str = "predict") -> np.ndarray:
+        key = (split, method)
+        if key not in self._predictions:
+            X, _ = self.split(split)
+            data_key = f"{self._data_hash}-{split}-{resolve_dtype(self.dtype).name}"
+            self._predictions[key] = cached_predict(
+                self.model, X, method, self._model_hash, data_key
+            )
+        return self._predictions[key]
+
+    def predict_proba(self, split: str) -> np.ndarray:
+        return self.predict(split, method="predict_proba")
+
+    def worker_budget(self, requested: Optional[int] = None) -> int:
+        """Workers a stage may start: ``requested`` when given, else its budget."""
+        if requested is not None and requested > 0:
+            return requested
+        if self.n_jobs is not None:
+            return self.n_jobs
+        return os.cpu_count() or 1
+
+    def configure_mlflow(self) -> None:
+        if not self._mlflow_configured:
+            configure_mlflow()
+            self._mlflow_configured = True
+
+    def start_run(self, **kwargs):
+        """``mlflow.start_run`` that records the run for the calling thread's ``pop_runs``."""
+        import mlflow
+
+        self.configure_mlflow()
+        run = mlflow.start_run(**kwargs)
+        self._runs.setdefault(threading.get_ident(), []).append(run.info.run_id)
+        return run
+
+    def pop_runs(self) -> List[str]:
+        """IDs of the runs this thread started with ``start_run`` since the last call."""
+        return self._runs.pop(threading.get_ident(), [])
+
+    @property
+    def mlflow_client(self):
+        if self._mlflow_client is None:
+            from mlflow.tracking import MlflowClient
+
+            self.configure_mlflow()
+            self._mlflow_client = MlflowClient()
+        return self._mlflow_client
+
+
+def resolve_context(ctx: Optional[PipelineContext] = None) -> PipelineContext:
+    if ctx is None:
+        return PipelineContext()
+    return ctx
@@ -1,86 +1,496 @@
+import argparse
+import os
+import uuid
+from collections import deque
 from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
 
 import numpy as np
 import pandas as pd
 import mlflow
 
+from src.context import PipelineContext, resolve_context
+from src.multivariate_drift import MULTIVARIATE_TESTS, multivariate_drift
+from src.quantile_sketch import FeatureSketches
 from src.utils import (
-    load_train_test_data,
-    configure_mlflow,
+    DATA_DIR,
+    DEFAULT_CHUNK_SIZE,
+    MODELS_DIR,
+    TARGET_COL,
+    as_chunks,
+    ensure_dir,
+    hash_file,
+    load_json,
+    sample_chunks,
     save_json,
     REPORTS_DIR,
 )
 
 
-def population_stability_index(expected: np.ndarray, actual: np.ndarray, bins: int = 10) -> float:
-    expected_counts, bin_edges = np.histogram(expected, bins=bins)
-    actual_counts, _ = np.histogram(actual, bins=bin_edges)
-    expected_perc = expected_counts.astype(float) / max(expected_counts.sum(), 1.0)
-    actual_perc = actual_counts.astype(float) / max(actual_counts.sum(), 1.0)
+BIN_STRATEGIES = ("uniform", "quantile", "sketch")
+REFERENCE_PROFILE_PATH = MODELS_DIR / "reference_profile.json"
+REFERENCE_SKETCH_PATH = MODELS_DIR / "reference_sketches.json"
+# Rows of the current data kept for the multivariate tests.
+MULTIVARIATE_SAMPLE_SIZE = 20_000
+# Bounds the (rows, features, edges) comparison block used for binning.
+_BIN_BLOCK_ELEMENTS = 1 << 24
+
+DIVERGENCES: Dict[str, Callable[[np.ndarray, np.ndarray], np.ndarray]] = {}
+
+
+def register_divergence(name: str):
+    """
+    Register ``func(expected_counts, actual_counts) -> per-feature values``;
+    both count matrices have shape (n_features, n_bins).
+    """
+
+    def decorator(func):
+        DIVERGENCES[name] = func
+        return func
+
+    return decorator
+
+
+def _as_matrix(X) -> np.ndarray:
+    X = np.asarray(X, dtype=float)
+    if X.ndim == 1:
+        X = X[:, None]
+    return X
+
+
+def compute_bin_edges(X_ref, bins: int = 10, strategy: str = "uniform") -> np.ndarray:
+    """Bin edges for every feature at once, shape (n_features, bins + 1)."""
+    X_ref = _as_matrix(X_ref)
+    if strategy == "uniform":
+        lo = np.min(X_ref, axis=0)
+        hi = np.max(X_ref, axis=0)
+        # Same widening as np.histogram for constant features.
+        flat = lo == hi
+        lo = np.where(flat, lo - 0.5, lo)
+        hi = np.where(flat, hi + 0.5, hi)
+        return np.linspace(lo, hi, bins + 1, axis=1)
+    if strategy == "quantile":
+        return np.quantile(X_ref, np.linspace(0.0, 1.0, bins + 1), axis=0).T
+    if strategy == "sketch":
+        return FeatureSketches([str(j) for j in range(X_ref.shape[1])]).update(X_ref).quantile_edges(bins)
+    raise ValueError(f"Unknown bin strategy: {strategy}")
+
+
+def bin_counts(X, edges: np.ndarray) -> np.ndarray:
+    """
+    Histogram every column of ``X`` against its own row of ``edges`` in one
+    vectorized pass. Matches np.histogram: bins are half-open except the
+    last, and values outside the edges are not counted.
+    """
+    X = _as_matrix(X)
+    n_features, n_edges = edges.shape
+    n_bins = n_edges - 1
+    counts = np.zeros(n_features * n_bins, dtype=np.int64)
+    inner = edges[None, :, 1:-1]
+    offsets = np.arange(n_features) * n_bins
+    # Summing the comparison mask in a narrow dtype is much faster than int64.
+    index_dtype = np.uint8 if n_bins < 256 else np.uint32
+    block = max(1, _BIN_BLOCK_ELEMENTS // max(1, n_features * n_bins))
+    for start in range(0, X.shape[0], block):
+        chunk = X[start:start + block]
+        idx = (chunk[:, :, None] >= inner).sum(axis=2, dtype=index_dtype).astype(np.intp)
+        valid = (chunk >= edges[:, 0]) & (chunk <= edges[:, -1])
+        idx += offsets
+        counts += np.bincount(idx[valid], minlength=n_features * n_bins)
+    return counts.reshape(n_features, n_bins)
+
+
+def _normalize(counts: np.ndarray) -> np.ndarray:
+    counts = counts.astype(float)
+    return counts / np.maximum(counts.sum(axis=1, keepdims=True), 1.0)
+
+
+@register_divergence("psi")
+def psi_from_counts(expected_counts: np.ndarray, actual_counts: np.ndarray) -> np.ndarray:
+    expected_perc = _normalize(expected_counts)
+    actual_perc = _normalize(actual_counts)
     eps = 1e-6
     psi_values = (actual_perc - expected_perc) * np.log(
         (actual_perc + eps) / (expected_perc + eps)
     )
-    return float(np.sum(psi_values))
+    return np.sum(psi_values, axis=1)
 
 
-def js_divergence(expected: np.ndarray, actual: np.ndarray, bins: int = 10) -> float:
-    p_counts, bin_edges = np.histogram(expected, bins=bins)
-    q_counts, _ = np.histogram(actual, bins=bin_edges)
-    p = p_counts.astype(float)
-    q = q_counts.astype(float)
-    if p.sum() == 0 or q.sum() == 0:
-        return 0.0
-    p = p / p.sum()
-    q = q / q.sum()
+@register_divergence("js")
+def js_from_counts(expected_counts: np.ndarray, actual_counts: np.ndarray) -> np.ndarray:
+    p = _normalize(expected_counts)
+    q = _normalize(actual_counts)
     m = 0.5 * (p + q)
     eps = 1e-12
-    kl_pm = np.sum(p * np.log((p + eps) / (m + eps)))
-    kl_qm = np.sum(q * np.log((q + eps) / (m + eps)))
-    return float(0.5 * (kl_pm + kl_qm))
-
-
-def monitor_drift() -> dict:
-    X_train, X_test, y_train, y_test = load_train_test_data()
-    drift_stats = {}
-    psi_values = []
-    js_values = []
-    for col in X_train.columns:
-        expected = np.asarray(X_train[col])
-        actual = np.asarray(X_test[col])
-        psi = population_stability_index(expected, actual)
-        js = js_divergence(expected, actual)
-        drift_stats[col] = {"psi": psi, "js": js}
-        psi_values.append(psi)
-        js_values.append(js)
-    max_psi = float(max(psi_values) if psi_values else 0.0)
-    avg_psi = float(np.mean(psi_values) if psi_values else 0.0)
-    max_js = float(max(js_values) if js_values else 0.0)
-    avg_js = float(np.mean(js_values) if js_values else 0.0)
-    drift_detected = bool(max_psi > 0.2 or max_js > 0.1)
-    metrics = {
+    kl_pm = np.sum(p * np.log((p + eps) / (m + eps)), axis=1)
+    kl_qm = np.sum(q * np.log((q + eps) / (m + eps)), axis=1)
+    js = 0.5 * (kl_pm + kl_qm)
+    empty = (expected_counts.sum(axis=1) == 0) | (actual_counts.sum(axis=1) == 0)
+    return np.where(empty, 0.0, js)
+
+
+def divergences_from_counts(
+    expected_counts: np.ndarray,
+    actual_counts: np.ndarray,
+    names: Optional[List[str]] = None,
+) -> Dict[str, np.ndarray]:
+    names = list(DIVERGENCES) if names is None else names
+    return {name: DIVERGENCES[name](expected_counts, actual_counts) for name in names}
+
+
+def population_stability_index(expected: np.ndarray, actual: np.ndarray, bins: int = 10) -> float:
+    edges = compute_bin_edges(expected, bins=bins)
+    return float(psi_from_counts(bin_counts(expected, edges), bin_counts(actual, edges))[0])
+
+
+def js_divergence(expected: np.ndarray, actual: np.ndarray, bins: int = 10) -> float:
+    edges = compute_bin_edges(expected, bins=bins)
+    return float(js_from_counts(bin_counts(expected, edges), bin_counts(actual, edges))[0])
+
+
+def _current_counts(current_data, edges: np.ndarray) -> np.ndarray:
+    if isinstance(current_data, pd.DataFrame):
+        return bin_counts(current_data.to_numpy(), edges)
+    counts = np.zeros((edges.shape[0], edges.shape[1] - 1), dtype=np.int64)
+    for X, _ in as_chunks(current_data):
+        counts += bin_counts(X.to_numpy(), edges)
+    return counts
+
+
+def drift_summary(
+    columns: List[str],
+    expected_counts: np.ndarray,
+    actual_counts: np.ndarray,
+) -> dict:
+    values = divergences_from_counts(expected_counts, actual_counts)
+    drift_stats = {
+        col: {name: float(values[name][i]) for name in values}
+        for i, col in enumerate(columns)
+    }
+    psi_values = values["psi"]
+    js_values = values["js"]
+    max_psi = float(np.max(psi_values) if psi_values.size else 0.0)
+    avg_psi = float(np.mean(psi_values) if psi_values.size else 0.0)
+    max_js = float(np.max(js_values) if js_values.size else 0.0)
+    avg_js = float(np.mean(js_values) if js_values.size else 0.0)
+    return {
         "per_feature": drift_stats,
         "max_psi": max_psi,
         "avg_psi": avg_psi,
         "max_js": max_js,
         "avg_js": avg_js,
-        "drift_detected": drift_detected,
+        "drift_detected": bool(max_psi > 0.2 or max_js > 0.1),
+    }
+
+
+def build_reference_profile(X_ref: pd.DataFrame, bins: int = 10, strategy: str = "uniform") -> dict:
+    """Bin edges and counts per feature of the reference (training) data."""
+    values = X_ref.to_numpy()
+    edges = compute_bin_edges(values, bins=bins, strategy=strategy)
+    train_path = DATA_DIR / "train.csv"
+    return {
+        "columns": list(X_ref.columns),
+        "bins": bins,
+        "strategy": strategy,
+        "n_rows": int(values.shape[0]),
+        "train_sha256": hash_file(train_path) if train_path.exists() else None,
+        "edges": edges.tolist(),
+        "counts": bin_counts(values, edges).tolist(),
     }
+
+
+def _save_json_atomic(path: Path, data: dict) -> None:
+    # Drift runs may read the reference while train rewrites it.
+    ensure_dir(path.parent)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    save_json(tmp, data)
+    os.replace(tmp, path)
+
+
+def save_reference_profile(profile: dict, path: Path = None) -> Path:
+    path = path or REFERENCE_PROFILE_PATH
+    _save_json_atomic(path, profile)
+    return path
+
+
+def load_reference_profile(path: Path = None) -> Optional[dict]:
+    path = path or REFERENCE_PROFILE_PATH
+    if not path.exists():
+        return None
+    profile = load_json(path)
+    profile["edges"] = np.asarray(profile["edges"], dtype=float)
+    profile["counts"] = np.asarray(profile["counts"], dtype=np.int64)
+    return profile
+
+
+def _profile_matches(profile: Optional[dict], columns: List[str], bins: int, strategy: str) -> bool:
+    if profile is None:
+        return False
+    train_path = DATA_DIR / "train.csv"
+    return (
+        profile["columns"] == columns
+        and profile["bins"] == bins
+        and profile["strategy"] == strategy
+        and train_path.exists()
+        and profile["train_sha256"] == hash_file(train_path)
+    )
+
+
+def build_feature_sketches(data, columns: List[str] = None, k: int = 200) -> FeatureSketches:
+    """
+    Sketch every feature of ``data`` (a frame, an (X, y) pair or a chunk
+    stream) in one streaming pass with fixed memory per feature.
+    """
+    if isinstance(data, pd.DataFrame):
+        data = [(data, None)]
+    else:
+        data = as_chunks(data)
+    sketches = None
+    for X, _ in data:
+        if sketches is None:
+            sketches = FeatureSketches(columns or list(X.columns), k=k)
+        sketches.update(X)
+    if sketches is None:
+        raise ValueError("Cannot sketch an empty stream")
+    return sketches
+
+
+def save_reference_sketches(sketches: FeatureSketches, path: Path = None) -> Path:
+    path = path or REFERENCE_SKETCH_PATH
+    train_path = DATA_DIR / "train.csv"
+    data = sketches.to_dict()
+    data["train_sha256"] = hash_file(train_path) if train_path.exists() else None
+    _save_json_atomic(path, data)
+    return path
+
+
+def load_reference_sketches(path: Path = None) -> Optional[dict]:
+    path = path or REFERENCE_SKETCH_PATH
+    if not path.exists():
+        return None
+    data = load_json(path)
+    return {"sketches": FeatureSketches.from_dict(data), "train_sha256": data.get("train_sha256")}
+
+
+def sketch_drift(reference: FeatureSketches, current: FeatureSketches, bins: int = 10) -> dict:
+    """PSI/JS on quantile bins of the reference sketch, estimated from both sketches."""
+    edges = reference.quantile_edges(bins)
+    return drift_summary(reference.columns, reference.bin_counts(edges), current.bin_counts(edges))
+
+
+class DriftWindow:
+    """
+    Incremental drift over a stream of batches scored against a reference
+    profile. Rows are counted in panes of ``step`` rows; a window is the sum
+    of the last ``size // step`` panes, so each update costs one binning of
+    the new rows. ``step == size`` gives tumbling windows, a smaller
+    ``step`` gives sliding windows that overlap by ``size - step`` rows.
+    """
+
+    def __init__(self, profile: dict, size: int, step: Optional[int] = None):
+        step = step or size
+        if size <= 0 or step <= 0 or size % step:
+            raise ValueError("Window size must be a positive multiple of the step")
+        self.columns = list(profile["columns"])
+        self.edges = np.asarray(profile["edges"], dtype=float)
+        self.reference_counts = np.asarray(profile["counts"], dtype=np.int64)
+        self.size = size
+        self.step = step
+        self.rows_seen = 0
+        self.windows_emitted = 0
+        self._panes = deque(maxlen=size // step)
+        self._window_counts = np.zeros_like(self.reference_counts)
+        self._pane_counts = np.zeros_like(self.reference_counts)
+        self._pane_rows = 0
+
+    @property
+    def mode(self) -> str:
+        return "tumbling" if self.step == self.size else "sliding"
+
+    def _close_pane(self) -> Optional[dict]:
+        if len(self._panes) == self._panes.maxlen:
+            self._window_counts -= self._panes[0]
+        self._panes.append(self._pane_counts)
+        self._window_counts += self._pane_counts
+        self._pane_counts = np.zeros_like(self.reference_counts)
+        self._pane_rows = 0
+        if len(self._panes) < self._panes.maxlen:
+            return None
+        result = drift_summary(self.columns, self.reference_counts, self._window_counts)
+        result.update(
+            {
+                "window": self.windows_emitted,
+                "mode": self.mode,
+                "window_rows": self.size,
+                "end_row": self.rows_seen,
+            }
+        )
+        self.windows_emitted += 1
+        if self.mode == "tumbling":
+            self._panes.clear()
+            self._window_counts = np.zeros_like(self.reference_counts)
+        return result
+
+    def update(self, X) -> List[dict]:
+        """Add a batch of rows and return every window completed by it."""
+        if isinstance(X, pd.DataFrame):
+            X = X[self.columns].to_numpy()
+        X = _as_matrix(X)
+        emitted = []
+        start = 0
+        while start < X.shape[0]:
+            take = min(self.step - self._pane_rows, X.shape[0] - start)
+            self._pane_counts += bin_counts(X[start:start + take], self.edges)
+            self._pane_rows += take
+            self.rows_seen += take
+            start += take
+            if self._pane_rows == self.step:
+                result = self._close_pane()
+                if result is not None:
+                    emitted.append(result)
+        return emitted
+
+
+def monitor_windows(
+    batches: Iterable,
+    size: int,
+    step: Optional[int] = None,
+    profile: dict = None,
+) -> List[dict]:
+    """
+    Stream ``batches`` (frames or (X, y) chunks) through a ``DriftWindow``
+    built from the persisted reference profile and report every window.
+    """
+    profile = profile or load_reference_profile()
+    if profile is None:
+        raise FileNotFoundError(f"Reference profile not found: {REFERENCE_PROFILE_PATH}")
+    window = DriftWindow(profile, size=size, step=step)
+    results = []
+    for batch in batches:
+        X = batch[0] if isinstance(batch, tuple) else batch
+        results.extend(window.update(X))
+    summary = [
+        {k: v for k, v in result.items() if k != "per_feature"} for result in results
+    ]
+    save_json(
+        REPORTS_DIR / "drift_windows.json",
+        {
+            "mode": window.mode,
+            "window_rows": size,
+            "step_rows": window.step,
+            "rows_seen": window.rows_seen,
+            "windows": summary,
+        },
+    )
+    return results
+
+
+def monitor_drift(
+    ctx: PipelineContext = None,
+    current_data=None,
+    bins: int = 10,
+    strategy: str = "uniform",
+    multivariate=MULTIVARIATE_TESTS,
+) -> dict:
+    """
+    Compare the test split (or ``current_data``: a frame, an (X, y) pair or
+    a chunk stream) against the training data. The persisted reference
+    profile is used instead of re-binning the training split when it was
+    built from the current train.csv with the same binning. ``multivariate``
+    selects the joint-distribution tests reported under "multivariate".
+    """
+    ctx = resolve_context(ctx)
+    X_train, X_test, y_train, y_test = ctx.data
+    if current_data is None:
+        current_data = X_test
+    columns = list(X_train.columns)
+    if strategy == "sketch":
+        reference = load_reference_sketches()
+        train_path = DATA_DIR / "train.csv"
+        if (
+            reference is not None
+            and reference["sketches"].columns == columns
+            and train_path.exists()
+            and reference["train_sha256"] == hash_file(train_path)
+        ):
+            reference_sketches = reference["sketches"]
+        else:
+            reference_sketches = build_feature_sketches((X_train, y_train))
+        current_sketches = build_feature_sketches(current_data, columns=columns)
+        metrics = sketch_drift(reference_sketches, current_sketches, bins=bins)
+    else:
+        profile = load_reference_profile()
+        if _profile_matches(profile, columns, bins, strategy):
+            edges = profile["edges"]
+            expected_counts = profile["counts"]
+        else:
+            edges = compute_bin_edges(X_train.to_numpy(), bins=bins, strategy=strategy)
+            expected_counts = bin_counts(X_train.to_numpy(), edges)
+        actual_counts = _current_counts(current_data, edges)
+        metrics = drift_summary(columns, expected_counts, actual_counts)
+    metrics["bin_strategy"] = strategy
+    if multivariate:
+        if isinstance(current_data, pd.DataFrame):
+            X_current = current_data[columns]
+        else:
+            X_current = sample_chunks(as_chunks(current_data), sample_size=MULTIVARIATE_SAMPLE_SIZE)
+        metrics["multivariate"] = multivariate_drift(
+            X_train.to_numpy(), X_current.to_numpy(), tests=tuple(multivariate), n_jobs=ctx.worker_budget()
+        )
+    max_psi = metrics["max_psi"]
+    avg_psi = metrics["avg_psi"]
+    max_js = metrics["max_js"]
+    avg_js = metrics["avg_js"]
+    drift_detected = metrics["drift_detected"]
     path = REPORTS_DIR / "drift_metrics.json"
     save_json(path, metrics)
-    configure_mlflow()
-    with mlflow.start_run(run_name="drift_monitor"):
+    ctx.configure_mlflow()
+    with ctx.start_run(run_name="drift_monitor"):
         mlflow.log_metric("max_psi", max_psi)
         mlflow.log_metric("avg_psi", avg_psi)
         mlflow.log_metric("max_js", max_js)
         mlflow.log_metric("avg_js", avg_js)
         mlflow.log_param("drift_detected", str(drift_detected))
+        for name, result in metrics.get("multivariate", {}).items():
+            if isinstance(result, dict):
+                mlflow.log_metric(f"{name}_p_value", result["p_value"])
         mlflow.log_artifact(str(path), artifact_path="drift_monitor")
     return metrics
 
 
 def main() -> None:
-    monitor_drift()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--stream",
+        type=str,
+        default=None,
+        help="CSV of production rows to monitor in windows against the reference profile.",
+    )
+    parser.add_argument("--window-size", type=int, default=10_000)
+    parser.add_argument(
+        "--step",
+        type=int,
+        default=None,
+        help="Rows between sliding windows; defaults to tumbling windows.",
+    )
+    parser.add_argument("--bins", type=int, default=10)
+    parser.add_argument("--strategy", choices=BIN_STRATEGIES, default="uniform")
+    parser.add_argument(
+        "--multivariate",
+        nargs="*",
+        choices=MULTIVARIATE_TESTS,
+        default=list(MULTIVARIATE_TESTS),
+        help="Multivariate tests to run; pass no names to skip them",
+    )
+    args = parser.parse_args()
+    if args.stream is None:
+        monitor_drift(bins=args.bins, strategy=args.strategy, multivariate=args.multivariate)
+        return
+    batches = (
+        chunk.drop(columns=[TARGET_COL], errors="ignore")
+        for chunk in pd.read_csv(args.stream, chunksize=DEFAULT_CHUNK_SIZE)
+    )
+    monitor_windows(batches, size=args.window_size, step=args.step)
 
 
 if __name__ == "__main__":
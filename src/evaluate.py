@@ -4,24 +4,44 @@ import numpy as np
 import mlflow
 from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
 
+from src.context import PipelineContext, resolve_context
 from src.utils import (
-    load_train_test_data,
-    load_model,
-    configure_mlflow,
+    as_chunks,
     save_json,
     MODELS_DIR,
     REPORTS_DIR,
 )
 
 
-def evaluate() -> dict:
-    X_train, X_test, y_train, y_test = load_train_test_data()
-    model = load_model()
-    y_pred = model.predict(X_test)
-    if hasattr(model, "predict_proba"):
-        y_proba = model.predict_proba(X_test)[:, 1]
+def _predict_chunks(model, chunks):
+    y_true, y_pred, y_proba = [], [], []
+    for X, y in chunks:
+        pred = np.asarray(model.predict(X))
+        y_true.append(np.asarray(y))
+        y_pred.append(pred)
+        if hasattr(model, "predict_proba"):
+            y_proba.append(model.predict_proba(X)[:, 1])
+        else:
+            y_proba.append(pred.astype(float))
+    return np.concatenate(y_true), np.concatenate(y_pred), np.concatenate(y_proba)
+
+
+def evaluate(ctx: PipelineContext = None, test_data=None) -> dict:
+    """
+    Score the test split held by ``ctx``, or ``test_data`` when given: either
+    an (X, y) pair or a stream of (X, y) chunks.
+    """
+    ctx = resolve_context(ctx)
+    model = ctx.model
+    if test_data is None:
+        X_test, y_test = ctx.split("test")
+        y_pred = ctx.predict("test")
+        if hasattr(model, "predict_proba"):
+            y_proba = ctx.predict_proba("test")[:, 1]
+        else:
+            y_proba = y_pred.astype(float)
     else:
-        y_proba = y_pred.astype(float)
+        y_test, y_pred, y_proba = _predict_chunks(model, as_chunks(test_data))
     metrics = {
         "accuracy": float(accuracy_score(y_test, y_pred)),
         "f1": float(f1_score(y_test, y_pred)),
@@ -36,8 +56,8 @@ def evaluate() -> dict:
         "y_proba": list(map(float, np.asarray(y_proba))),
     }
     save_json(baseline_path, baseline)
-    configure_mlflow()
-    with mlflow.start_run(run_name="evaluate_model"):
+    ctx.configure_mlflow()
+    with ctx.start_run(run_name="evaluate_model"):
         for k, v in metrics.items():
             mlflow.log_metric(k, v)
         mlflow.log_artifact(str(metrics_path), artifact_path="evaluation")
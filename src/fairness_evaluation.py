@@ -3,10 +3,8 @@ from typing import Any, Dict, Tuple
 
 import numpy as np
 
+from src.context import PipelineContext, resolve_context
 from src.utils import (
-    load_train_test_data,
-    load_model,
-    configure_mlflow,
     save_json,
     REPORTS_DIR,
 )
@@ -24,7 +22,8 @@ def _build_sensitive_feature(X) -> Tuple[np.ndarray, Dict[str, Any]]:
     return sensitive, meta
 
 
-def run_fairness() -> Dict[str, Any]:
+def run_fairness(ctx: PipelineContext = None) -> Dict[str, Any]:
+    ctx = resolve_context(ctx)
     try:
         from fairlearn.metrics import (
             MetricFrame,
@@ -43,10 +42,9 @@ def run_fairness() -> Dict[str, Any]:
         save_json(path, error_report)
         return error_report
 
-    X_train, X_test, y_train, y_test = load_train_test_data()
-    model = load_model()
+    X_train, X_test, y_train, y_test = ctx.data
 
-    y_pred = model.predict(X_test)
+    y_pred = ctx.predict("test")
     sensitive, sensitive_meta = _build_sensitive_feature(X_test)
 
     frame = MetricFrame(
@@ -98,11 +96,11 @@ def run_fairness() -> Dict[str, Any]:
     save_json(path, result)
 
     # Optional MLflow logging for traceability
-    configure_mlflow()
+    ctx.configure_mlflow()
     try:
         import mlflow
 
-        with mlflow.start_run(run_name="fairlearn_fairness"):
+        with ctx.start_run(run_name="fairlearn_fairness"):
             for k, v in result["overall"].items():
                 mlflow.log_metric(f"fairness_overall_{k}", v)
             for group, metrics in result["by_group"].items():
@@ -3,9 +3,8 @@ from typing import Any, Dict
 
 import numpy as np
 
+from src.context import PipelineContext, resolve_context
 from src.utils import (
-    load_train_test_data,
-    load_model,
     save_json,
     ensure_dir,
     REPORTS_DIR,
@@ -16,7 +15,8 @@ def _default_feature_types(columns) -> Dict[str, str]:
     return {c: "numeric" for c in columns}
 
 
-def run_giskard_scan() -> Dict[str, Any]:
+def run_giskard_scan(ctx: PipelineContext = None) -> Dict[str, Any]:
+    ctx = resolve_context(ctx)
     reports_dir = REPORTS_DIR / "giskard"
     ensure_dir(reports_dir)
 
@@ -31,8 +31,8 @@ def run_giskard_scan() -> Dict[str, Any]:
         save_json(reports_dir / "giskard_status.json", result)
         return result
 
-    X_train, X_test, y_train, y_test = load_train_test_data()
-    model = load_model()
+    X_train, X_test, y_train, y_test = ctx.data
+    model = ctx.model
 
     def predict_fn(df):
         if hasattr(model, "predict_proba"):
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import mmap
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from src.utils import CACHE_DIR, ensure_dir
+
+
+DIGEST_CACHE_DIR = CACHE_DIR / "digests"
+
+_memo: Dict[Tuple[str, int, int, int, int], str] = {}
+
+
+def _stat_key(path: Path) -> Tuple[str, int, int, int, int]:
+    st = path.stat()
+    # ctime catches an mtime rewound with utime(), but anyone who can write
+    # the file can also write its sidecar, so cached digests are not evidence
+    # of integrity. Signing and verification pass use_cache=False.
+    return str(path), st.st_size, st.st_mtime_ns, st.st_ino, st.st_ctime_ns
+
+
+def _sidecar_path(path: Path) -> Path:
+    name = hashlib.sha256(str(path).encode("utf-8")).hexdigest()[:32]
+    return DIGEST_CACHE_DIR / f"{name}.json"
+
+
+def compute_digest(path: Path) -> str:
+    """SHA-256 of ``path`` without Python-level chunk copies."""
+    with Path(path).open("rb") as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hashlib.sha256(mapped).hexdigest()
+
+
+def _read_sidecar(key: Tuple[str, int, int, int, int]) -> Optional[str]:
+    sidecar = _sidecar_path(Path(key[0]))
+    try:
+        entry = json.loads(sidecar.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    fields = ("path", "size", "mtime_ns", "inode", "ctime_ns")
+    if [entry.get(name) for name in fields] != list(key):
+        return None
+    return entry.get("sha256")
+
+
+def _write_sidecar(key: Tuple[str, int, int, int, int], digest: str) -> None:
+    sidecar = _sidecar_path(Path(key[0]))
+    entry = {
+        "path": key[0],
+        "size": key[1],
+        "mtime_ns": key[2],
+        "inode": key[3],
+        "ctime_ns": key[4],
+        "sha256": digest,
+    }
+    try:
+        ensure_dir(sidecar.parent)
+        tmp = sidecar.with_name(f".{sidecar.name}.{uuid.uuid4().hex}.tmp")
+        tmp.write_text(json.dumps(entry), encoding="utf-8")
+        os.replace(tmp, sidecar)
+    except OSError:
+        # The cache is an optimisation; a read-only checkout still hashes fine.
+        pass
+
+
+def file_digest(path: Path, use_cache: bool = True) -> str:
+    """
+    SHA-256 hex digest of ``path``. Digests are reused, in-process and via
+    sidecar files under ``.cache/digests``, while the file's size, mtime,
+    inode and ctime are unchanged. Security checks must pass
+    ``use_cache=False`` so the file's bytes are always hashed.
+    """
+    path = Path(path).resolve()
+    if not use_cache:
+        return compute_digest(path)
+    key = _stat_key(path)
+    digest = _memo.get(key)
+    if digest is None:
+        digest = _read_sidecar(key)
+    if digest is None:
+        digest = compute_digest(path)
+        # Only trust the digest if the file did not change while it was read.
+        if _stat_key(path) == key:
+            _write_sidecar(key, digest)
+        else:
+            return digest
+    _memo[key] = digest
+    return digest
+
+
+def hash_files(
+    paths: Iterable[Path],
+    max_workers: Optional[int] = None,
+    use_cache: bool = True,
+) -> Dict[str, str]:
+    """Digest many files concurrently; hashlib releases the GIL while hashing."""
+    paths = [Path(p) for p in paths]
+    if max_workers is None:
+        max_workers = min(len(paths), os.cpu_count() or 1) or 1
+    with ThreadPoolExecutor(max_workers) as pool:
+        digests = list(pool.map(lambda p: file_digest(p, use_cache=use_cache), paths))
+    return {str(path): digest for path, digest in zip(paths, digests)}
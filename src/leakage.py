@@ -0,0 +1,245 @@
+import argparse
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+import mlflow
+
+from src.context import PipelineContext, resolve_context
+from src.utils import (
+    as_chunks,
+    save_json,
+    REPORTS_DIR,
+)
+
+
+# Near duplicates lie within this RMS per-feature distance, in standard deviations.
+DEFAULT_RADIUS = 0.05
+DEFAULT_TABLES = 16
+# Candidates taken from one bucket; bounds the work in very dense regions.
+MAX_BUCKET_CANDIDATES = 32
+_VERIFY_BLOCK_PAIRS = 1 << 18
+
+
+def row_hashes(X: pd.DataFrame) -> np.ndarray:
+    """64-bit content hash of every row, ignoring the index."""
+    return pd.util.hash_pandas_object(X.reset_index(drop=True), index=False).to_numpy()
+
+
+class LSHIndex:
+    """
+    Locality-sensitive hash index over standardised rows. Each of
+    ``n_tables`` tables quantises ``n_projections`` random Gaussian
+    projections with bucket width ``4 * radius * sqrt(d)``, so rows within the
+    near-duplicate radius share a bucket in some table with high probability
+    while distant rows rarely do. Keys of every table are kept sorted, so a
+    lookup is a binary search.
+    """
+
+    def __init__(
+        self,
+        mean: np.ndarray,
+        std: np.ndarray,
+        radius: float = DEFAULT_RADIUS,
+        n_tables: int = DEFAULT_TABLES,
+        n_projections: int = 4,
+        seed: int = 42,
+    ):
+        rng = np.random.default_rng(seed)
+        d = len(mean)
+        self.mean = np.asarray(mean, dtype=float)
+        self.std = np.where(np.asarray(std, dtype=float) == 0, 1.0, std)
+        self.radius = radius
+        self.threshold = radius * np.sqrt(d)
+        self.width = 4.0 * self.threshold
+        self.projections = rng.normal(size=(n_tables, d, n_projections))
+        self.offsets = rng.uniform(0.0, self.width, size=(n_tables, 1, n_projections))
+        self.multipliers = rng.integers(1, 2 ** 62, size=n_projections, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+        self.sorted_keys = None
+        self.order = None
+        self.exact = None
+
+    def standardize(self, X) -> np.ndarray:
+        return (np.asarray(X, dtype=float) - self.mean) / self.std
+
+    def keys(self, Z: np.ndarray) -> np.ndarray:
+        """Bucket keys of standardised rows, shape (n_tables, n_rows)."""
+        buckets = np.floor((np.einsum("nd,tdk->tnk", Z, self.projections) + self.offsets) / self.width)
+        with np.errstate(over="ignore"):
+            return (buckets.astype(np.int64).astype(np.uint64) * self.multipliers).sum(axis=2)
+
+    def fit(self, chunks) -> "LSHIndex":
+        keys, exact = [], []
+        for X, _ in chunks:
+            keys.append(self.keys(self.standardize(X)))
+            exact.append(row_hashes(X))
+        keys = np.concatenate(keys, axis=1)
+        self.order = np.argsort(keys, axis=1, kind="stable")
+        if keys.shape[1] < 2 ** 31:
+            self.order = self.order.astype(np.int32)
+        self.sorted_keys = np.take_along_axis(keys, self.order, axis=1)
+        self.exact = np.unique(np.concatenate(exact))
+        return self
+
+    def candidates(self, Z: np.ndarray):
+        """(query row, indexed row) pairs sharing a bucket in any table."""
+        queries, rows = [], []
+        for table, query_keys in enumerate(self.keys(Z)):
+            left = np.searchsorted(self.sorted_keys[table], query_keys, side="left")
+            right = np.searchsorted(self.sorted_keys[table], query_keys, side="right")
+            counts = np.minimum(right - left, MAX_BUCKET_CANDIDATES)
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            query_idx = np.repeat(np.arange(len(Z)), counts)
+            within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            queries.append(query_idx)
+            rows.append(self.order[table][np.repeat(left, counts) + within])
+        if not queries:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        n_rows = len(self.order[0])
+        pairs = np.unique(np.concatenate(queries).astype(np.int64) * n_rows + np.concatenate(rows))
+        return pairs // n_rows, pairs % n_rows
+
+
+def projections_for(n_rows: int, radius: float = DEFAULT_RADIUS) -> int:
+    """
+    Projections per table so that a table has more occupied buckets than
+    rows: each projection spans roughly ``6 / (4 * radius)`` buckets of the
+    standardised data.
+    """
+    buckets = max(2.0, 1.5 / radius)
+    return int(np.ceil(np.log(max(n_rows, 2)) / np.log(buckets))) + 1
+
+
+def _column_stats(chunks):
+    n, total, squares = 0, 0.0, 0.0
+    for X, _ in chunks:
+        values = np.asarray(X, dtype=float)
+        n += len(values)
+        total = total + values.sum(axis=0)
+        squares = squares + (values ** 2).sum(axis=0)
+    mean = total / n
+    return n, mean, np.sqrt(np.maximum(squares / n - mean ** 2, 0.0))
+
+
+def scan_leakage(
+    train_data,
+    test_data,
+    X_train_rows=None,
+    y_train=None,
+    radius: float = DEFAULT_RADIUS,
+    n_tables: int = DEFAULT_TABLES,
+    n_projections: int = None,
+    top_n: int = 20,
+    seed: int = 42,
+) -> Dict:
+    """
+    Exact and near-duplicate test rows with respect to the training rows.
+    ``train_data`` and ``test_data`` are (X, y) pairs or re-iterable chunk
+    streams. Candidate pairs are verified against ``X_train_rows``, a
+    row-indexable array of the training features such as the memory-mapped
+    split; it defaults to the rows of an in-memory ``train_data`` pair.
+    Memory is linear in the training rows and bounded per test chunk.
+    """
+    train_chunks = as_chunks(train_data)
+    if X_train_rows is None:
+        X_train_rows, y_train = train_data
+    X_train_rows = np.asarray(X_train_rows)
+    y_train = None if y_train is None else np.asarray(y_train)
+    n_train, mean, std = _column_stats(train_chunks)
+    if n_projections is None:
+        n_projections = projections_for(n_train, radius)
+    index = LSHIndex(mean, std, radius, n_tables, n_projections, seed).fit(train_chunks)
+
+    n_test = n_exact = n_near = n_conflicts = n_candidates = 0
+    closest = []
+    offset = 0
+    for X, y in as_chunks(test_data):
+        exact = np.isin(row_hashes(X), index.exact)
+        Z = index.standardize(X)
+        query_idx, train_idx = index.candidates(Z)
+        n_candidates += len(query_idx)
+        distance = np.concatenate(
+            [
+                np.sqrt(np.mean((Z[q] - index.standardize(X_train_rows[t])) ** 2, axis=1))
+                for q, t in zip(
+                    np.array_split(query_idx, len(query_idx) // _VERIFY_BLOCK_PAIRS + 1),
+                    np.array_split(train_idx, len(train_idx) // _VERIFY_BLOCK_PAIRS + 1),
+                )
+            ]
+        )
+        near = distance <= radius
+        query_idx, train_idx, distance = query_idx[near], train_idx[near], distance[near]
+        near_rows = np.zeros(len(X), dtype=bool)
+        near_rows[query_idx] = True
+        n_exact += int(exact.sum())
+        n_near += int((near_rows & ~exact).sum())
+        if y_train is not None and y is not None:
+            conflicts = y_train[train_idx] != np.asarray(y)[query_idx]
+            n_conflicts += int(len(np.unique(query_idx[conflicts])))
+        best = np.argsort(distance, kind="stable")[:top_n]
+        closest.extend(
+            (float(distance[i]), offset + int(query_idx[i]), int(train_idx[i])) for i in best
+        )
+        n_test += len(X)
+        offset += len(X)
+    closest.sort()
+    return {
+        "n_train": int(n_train),
+        "n_test": int(n_test),
+        "exact_duplicates": n_exact,
+        "exact_duplicate_fraction": float(n_exact / n_test) if n_test else 0.0,
+        "near_duplicates": n_near,
+        "near_duplicate_fraction": float(n_near / n_test) if n_test else 0.0,
+        "label_conflicts": n_conflicts,
+        "candidate_pairs": int(n_candidates),
+        "radius": radius,
+        "n_tables": n_tables,
+        "n_projections": n_projections,
+        "closest_pairs": [
+            {"test_row": test_row, "train_row": train_row, "distance": distance}
+            for distance, test_row, train_row in closest[:top_n]
+        ],
+        "leakage_detected": bool(n_exact + n_near > 0),
+    }
+
+
+def detect_leakage(ctx: PipelineContext = None, test_data=None, radius: float = DEFAULT_RADIUS) -> dict:
+    """
+    Check the test split (or ``test_data``) for rows that duplicate or
+    nearly duplicate training rows; candidates are verified against the
+    memory-mapped training split.
+    """
+    ctx = resolve_context(ctx)
+    X_train, y_train = ctx.split("train")
+    if test_data is None:
+        test_data = ctx.split("test")
+    metrics = scan_leakage(
+        (X_train, y_train),
+        test_data,
+        X_train_rows=X_train.to_numpy(),
+        y_train=y_train.to_numpy(),
+        radius=radius,
+    )
+    path = REPORTS_DIR / "leakage.json"
+    save_json(path, metrics)
+    ctx.configure_mlflow()
+    with ctx.start_run(run_name="leakage"):
+        mlflow.log_metric("exact_duplicate_fraction", metrics["exact_duplicate_fraction"])
+        mlflow.log_metric("near_duplicate_fraction", metrics["near_duplicate_fraction"])
+        mlflow.log_metric("label_conflicts", metrics["label_conflicts"])
+        mlflow.log_param("leakage_detected", str(metrics["leakage_detected"]))
+        mlflow.log_artifact(str(path), artifact_path="leakage")
+    return metrics
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--radius", type=float, default=DEFAULT_RADIUS)
+    args = parser.parse_args()
+    detect_leakage(radius=args.radius)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from scipy.special import expit
+
+from src.attack_engine import is_linear_binary
+from src.utils import MODELS_DIR, hash_file
+
+
+LINEAR_SCORER_PATH = MODELS_DIR / "linear_scorer.npz"
+# Largest |p - predict_proba| accepted at export, per scorer dtype.
+EXPORT_TOLERANCE = {"float64": 1e-12, "float32": 1e-5}
+_CHECK_ROWS = 10_000
+
+
+class LinearScorer:
+    """
+    Array-backed scorer for a binary linear classifier: one dot product and
+    a sigmoid over a contiguous buffer, without the DataFrame construction
+    and input validation of sklearn's ``predict_proba``. Rows must be in
+    ``feature_names_in_`` order; a DataFrame is reordered to it.
+    """
+
+    def __init__(self, coef, intercept: float, feature_names, classes=(0, 1), dtype: str = "float64", model_sha256: str = None):
+        self.dtype = np.dtype(dtype)
+        self.coef = np.ascontiguousarray(coef, dtype=self.dtype).ravel()
+        self.intercept = self.dtype.type(intercept)
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.n_features_in_ = len(self.coef)
+        self.classes_ = np.asarray(classes)
+        self.model_sha256 = model_sha256
+
+    @classmethod
+    def from_model(cls, model, feature_names=None, dtype: str = "float64", model_sha256: str = None) -> "LinearScorer":
+        if not is_linear_binary(model):
+            raise ValueError("Only binary linear models can be exported to a LinearScorer")
+        if feature_names is None:
+            feature_names = getattr(model, "feature_names_in_", None)
+        if feature_names is None:
+            feature_names = [f"x{i}" for i in range(model.coef_.shape[1])]
+        return cls(model.coef_[0], float(model.intercept_[0]), feature_names, model.classes_, dtype, model_sha256)
+
+    def _rows(self, X) -> np.ndarray:
+        if hasattr(X, "columns"):
+            X = X[list(self.feature_names_in_)].to_numpy()
+        return np.ascontiguousarray(X, dtype=self.dtype)
+
+    def decision_function(self, X) -> np.ndarray:
+        return self._rows(X) @ self.coef + self.intercept
+
+    def proba(self, X) -> np.ndarray:
+        """Class-1 probability of every row."""
+        return expit(self.decision_function(X))
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = self.proba(X)
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+    def save(self, path: Path = None) -> Path:
+        if path is None:
+            path = LINEAR_SCORER_PATH
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                coef=self.coef,
+                intercept=np.asarray(self.intercept),
+                feature_names=self.feature_names_in_.astype(str),
+                classes=self.classes_,
+                model_sha256=np.asarray(self.model_sha256 or ""),
+            )
+        return path
+
+    @classmethod
+    def load(cls, path: Path = None) -> "LinearScorer":
+        if path is None:
+            path = LINEAR_SCORER_PATH
+        # Plain arrays only, so loading never unpickles anything.
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["coef"],
+                data["intercept"][()],
+                data["feature_names"].tolist(),
+                data["classes"],
+                data["coef"].dtype.name,
+                str(data["model_sha256"]) or None,
+            )
+
+
+def verify_scorer(scorer: LinearScorer, model, X) -> float:
+    """
+    Largest deviation of ``scorer`` from ``model.predict_proba`` on ``X``;
+    raises ValueError when it exceeds the tolerance of the scorer's dtype.
+    """
+    expected = model.predict_proba(X)[:, 1]
+    error = float(np.max(np.abs(scorer.proba(X) - expected), initial=0.0))
+    tolerance = EXPORT_TOLERANCE[scorer.dtype.name]
+    if error > tolerance:
+        raise ValueError(f"LinearScorer deviates from predict_proba by {error:.3g} (tolerance {tolerance:g})")
+    return error
+
+
+def export_linear_scorer(model, X_check, model_path: Path = None, path: Path = None, dtype: str = "float64") -> Path:
+    """
+    Export ``model`` as a LinearScorer next to ``model_path`` after checking
+    it against ``model.predict_proba`` on up to 10k rows of ``X_check``.
+    The scorer records the model file's digest so it is never served
+    alongside a different model.
+    """
+    model_sha256 = hash_file(model_path) if model_path is not None else None
+    scorer = LinearScorer.from_model(model, getattr(X_check, "columns", None), dtype, model_sha256)
+    verify_scorer(scorer, model, X_check[:_CHECK_ROWS])
+    if path is None:
+        path = LINEAR_SCORER_PATH if model_path is None else Path(model_path).with_name(LINEAR_SCORER_PATH.name)
+    return scorer.save(path)
+
+
+def load_linear_scorer(model_path: Path, path: Path = None) -> Optional[LinearScorer]:
+    """The scorer exported for ``model_path``, or None if absent or stale."""
+    model_path = Path(model_path)
+    if path is None:
+        path = model_path.with_name(LINEAR_SCORER_PATH.name)
+    if not Path(path).exists() or not model_path.exists():
+        return None
+    scorer = LinearScorer.load(path)
+    if scorer.model_sha256 != hash_file(model_path):
+        return None
+    return scorer
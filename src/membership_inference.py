@@ -0,0 +1,207 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score, roc_curve
+import mlflow
+
+from src.context import PipelineContext, resolve_context
+from src.utils import (
+    save_json,
+    REPORTS_DIR,
+)
+
+
+LOW_FPRS = (0.001, 0.01, 0.1)
+_PROBA_EPS = 1e-12
+
+
+def per_sample_loss(proba: np.ndarray, y) -> np.ndarray:
+    """Cross-entropy of every row's true label under class-1 probabilities ``proba``."""
+    y = np.asarray(y)
+    p_true = np.where(y == 1, proba, 1 - proba)
+    return -np.log(np.clip(p_true, _PROBA_EPS, 1.0))
+
+
+def attack_features(proba: np.ndarray, y) -> np.ndarray:
+    """Per-row attack inputs: true-class confidence, loss, entropy and label."""
+    y = np.asarray(y)
+    p = np.clip(proba, _PROBA_EPS, 1 - _PROBA_EPS)
+    p_true = np.where(y == 1, p, 1 - p)
+    entropy = -(p * np.log(p) + (1 - p) * np.log(1 - p))
+    return np.column_stack([p_true, -np.log(p_true), entropy, y])
+
+
+def attack_report(membership: np.ndarray, scores: np.ndarray, fprs: Sequence[float] = LOW_FPRS) -> Dict:
+    """ROC AUC of membership ``scores`` and the best TPR at each FPR bound."""
+    fpr, tpr, _ = roc_curve(membership, scores)
+    return {
+        "auc": float(roc_auc_score(membership, scores)),
+        "tpr_at_fpr": {str(bound): float(tpr[fpr <= bound].max()) for bound in fprs},
+    }
+
+
+def loss_threshold_attack(
+    proba_members: np.ndarray,
+    y_members,
+    proba_nonmembers: np.ndarray,
+    y_nonmembers,
+) -> Dict:
+    """Members tend to have lower loss; the negated loss is the membership score."""
+    scores = -np.concatenate(
+        [per_sample_loss(proba_members, y_members), per_sample_loss(proba_nonmembers, y_nonmembers)]
+    )
+    membership = np.concatenate([np.ones(len(proba_members)), np.zeros(len(proba_nonmembers))])
+    return attack_report(membership, scores)
+
+
+_worker_pool: Optional[Tuple[pd.DataFrame, pd.DataFrame, np.ndarray]] = None
+
+
+def _shadow_pool(ctx: PipelineContext) -> Tuple[pd.DataFrame, pd.DataFrame, np.ndarray]:
+    """The train and test splits as loaded, with labels over row ids numbered train first."""
+    X_train, X_test, y_train, y_test = ctx.data
+    return X_train, X_test, np.concatenate([np.asarray(y_train), np.asarray(y_test)])
+
+
+def _pool_rows(pool, idx: np.ndarray) -> pd.DataFrame:
+    # Gather only the requested rows from the (memory-mapped) splits.
+    X_train, X_test, _ = pool
+    train_values, test_values = X_train.to_numpy(), X_test.to_numpy()
+    in_train = idx < len(X_train)
+    rows = np.empty((len(idx), X_train.shape[1]), dtype=np.result_type(train_values, test_values))
+    rows[in_train] = train_values[idx[in_train]]
+    rows[~in_train] = test_values[idx[~in_train] - len(X_train)]
+    return pd.DataFrame(rows, columns=X_train.columns)
+
+
+def _init_worker(dtype: Optional[str]) -> None:
+    global _worker_pool
+    # Workers read the memory-mapped dataset cache instead of receiving the data.
+    _worker_pool = _shadow_pool(PipelineContext(dtype=dtype))
+
+
+def _train_shadow(estimator, in_idx: np.ndarray, out_idx: np.ndarray, pool=None) -> Tuple[np.ndarray, np.ndarray]:
+    pool = pool if pool is not None else _worker_pool
+    y = pool[2]
+    shadow = clone(estimator).fit(_pool_rows(pool, in_idx), y[in_idx])
+    rows = np.concatenate([in_idx, out_idx])
+    proba = shadow.predict_proba(_pool_rows(pool, rows))[:, 1]
+    membership = np.concatenate([np.ones(len(in_idx)), np.zeros(len(out_idx))])
+    return attack_features(proba, y[rows]), membership
+
+
+def shadow_model_attack(
+    ctx: PipelineContext,
+    members: np.ndarray,
+    nonmembers: np.ndarray,
+    n_shadows: int = 8,
+    max_workers: Optional[int] = None,
+    seed: int = 42,
+) -> Dict:
+    """
+    Shadow-model attack. The train and test rows are shuffled into
+    ``n_shadows`` disjoint shards; each shadow is a clone of the target model
+    fitted on half of its shard. An attack classifier learns member vs
+    non-member from the shadows' outputs and is then applied to the target
+    model's outputs on ``members`` (train rows) and ``nonmembers`` (test rows).
+    Shadows are trained in a process pool whose workers load the cached
+    splits themselves.
+    """
+    _, y_train = ctx.split("train")
+    _, y_test = ctx.split("test")
+    rng = np.random.default_rng(seed)
+    shards = np.array_split(rng.permutation(len(y_train) + len(y_test)), n_shadows)
+    tasks = [(shard[: len(shard) // 2], shard[len(shard) // 2:]) for shard in shards]
+    estimator = clone(ctx.model)
+    max_workers = max(1, min(ctx.worker_budget(max_workers), n_shadows))
+    if max_workers == 1:
+        pool = _shadow_pool(ctx)
+        results = [_train_shadow(estimator, in_idx, out_idx, pool) for in_idx, out_idx in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(ctx.dtype,)) as executor:
+            futures = [executor.submit(_train_shadow, estimator, in_idx, out_idx) for in_idx, out_idx in tasks]
+            results = [future.result() for future in futures]
+    features = np.concatenate([r[0] for r in results])
+    membership = np.concatenate([r[1] for r in results])
+    attack = LogisticRegression(max_iter=1000).fit(features, membership)
+
+    proba_train = ctx.predict_proba("train")[:, 1]
+    proba_test = ctx.predict_proba("test")[:, 1]
+    target = np.concatenate(
+        [
+            attack_features(proba_train[members], np.asarray(y_train)[members]),
+            attack_features(proba_test[nonmembers], np.asarray(y_test)[nonmembers]),
+        ]
+    )
+    scores = attack.predict_proba(target)[:, 1]
+    truth = np.concatenate([np.ones(len(members)), np.zeros(len(nonmembers))])
+    report = attack_report(truth, scores)
+    report["n_shadows"] = n_shadows
+    report["shadow_rows"] = int(len(membership))
+    return report
+
+
+def run_membership_inference(
+    ctx: PipelineContext = None,
+    n_shadows: int = 8,
+    max_workers: Optional[int] = None,
+    max_samples: int = 10_000,
+    seed: int = 42,
+) -> dict:
+    """
+    Membership inference against the trained model on balanced samples of
+    train (members) and test (non-members) rows, with a loss-threshold
+    attack and a shadow-model attack.
+    """
+    ctx = resolve_context(ctx)
+    _, y_train = ctx.split("train")
+    _, y_test = ctx.split("test")
+    rng = np.random.default_rng(seed)
+    n = min(len(y_train), len(y_test), max_samples)
+    members = np.sort(rng.choice(len(y_train), n, replace=False))
+    nonmembers = np.sort(rng.choice(len(y_test), n, replace=False))
+    proba_train = ctx.predict_proba("train")[:, 1]
+    proba_test = ctx.predict_proba("test")[:, 1]
+    metrics = {
+        "n_members": int(n),
+        "n_nonmembers": int(n),
+        "loss_threshold": loss_threshold_attack(
+            proba_train[members],
+            np.asarray(y_train)[members],
+            proba_test[nonmembers],
+            np.asarray(y_test)[nonmembers],
+        ),
+        "shadow": shadow_model_attack(
+            ctx, members, nonmembers, n_shadows=n_shadows, max_workers=max_workers, seed=seed
+        ),
+    }
+    best_auc = max(metrics["loss_threshold"]["auc"], metrics["shadow"]["auc"])
+    metrics["risk_score"] = float(min(1.0, max(0.0, 2.0 * (best_auc - 0.5))))
+    path = REPORTS_DIR / "membership_inference.json"
+    save_json(path, metrics)
+    ctx.configure_mlflow()
+    with ctx.start_run(run_name="membership_inference"):
+        for attack in ("loss_threshold", "shadow"):
+            mlflow.log_metric(f"{attack}_auc", metrics[attack]["auc"])
+            for bound, tpr in metrics[attack]["tpr_at_fpr"].items():
+                mlflow.log_metric(f"{attack}_tpr_at_fpr_{bound}", tpr)
+        mlflow.log_metric("risk_score", metrics["risk_score"])
+        mlflow.log_artifact(str(path), artifact_path="membership_inference")
+    return metrics
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shadows", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    run_membership_inference(n_shadows=args.shadows, max_workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
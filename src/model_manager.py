@@ -0,0 +1,178 @@
+import hashlib
+import io
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+from security.model_sign import verify_digest
+from src.hashing import file_digest
+from src.utils import load_model
+
+
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+class SignatureError(ValueError):
+    """A model artifact whose signature does not verify."""
+
+
+def read_artifact(path: Path) -> Tuple[bytes, str]:
+    """The bytes of ``path``, read once, and their SHA-256."""
+    data = Path(path).read_bytes()
+    return data, hashlib.sha256(data).hexdigest()
+
+
+def load_verified(
+    data: bytes,
+    digest: str,
+    loader: Callable = load_model,
+    public_key_path: Optional[Path] = None,
+    signature_path: Optional[Path] = None,
+):
+    """
+    Unpickle ``data`` (as returned by ``read_artifact``) with ``loader``,
+    which receives a file object. With ``public_key_path`` the signature
+    must verify ``digest`` first, otherwise a SignatureError is raised. The
+    bytes that were verified are the bytes that get loaded, so replacing
+    the file on disk in between has no effect.
+    """
+    if public_key_path is not None and not verify_digest(digest, public_key_path, signature_path):
+        raise SignatureError(f"Signature verification failed for model {digest}")
+    return loader(io.BytesIO(data))
+
+
+class ModelManager:
+    """
+    Serves the model at ``model_path`` and swaps in a new one when the file
+    changes. A background thread polls the file (and its signature); a changed
+    artifact is read once, its bytes verified against the signature and
+    loaded from that buffer with ``loader`` (which receives a file object),
+    then published as one (model, digest) snapshot. Callers read
+    ``model`` once per request or batch, so in-flight work finishes on the
+    model it started with. Digests that verified against the public key are
+    remembered, so reloading one (e.g. a rollback) skips verification.
+    Without ``public_key_path`` models are loaded unverified.
+    """
+
+    def __init__(
+        self,
+        model_path: Path,
+        public_key_path: Optional[Path] = None,
+        signature_path: Optional[Path] = None,
+        loader: Callable = load_model,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        self.model_path = Path(model_path)
+        self.public_key_path = None if public_key_path is None else Path(public_key_path)
+        self.signature_path = None if signature_path is None else Path(signature_path)
+        if self.public_key_path is not None and self.signature_path is None:
+            raise ValueError("A signature path is required to verify models")
+        self.loader = loader
+        self.poll_interval = poll_interval
+        self._active = None
+        self._verified = set()
+        self._stamp = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reloads = 0
+        self.verifications = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def model(self):
+        return self._active[0]
+
+    @property
+    def digest(self) -> str:
+        return self._active[1]
+
+    def _file_stamp(self):
+        stamps = []
+        for path in (self.model_path, self.signature_path):
+            try:
+                st = os.stat(path)
+                stamps.append((st.st_size, st.st_mtime_ns, st.st_ino, st.st_ctime_ns))
+            except (OSError, TypeError):
+                stamps.append(None)
+        return tuple(stamps)
+
+    def _trusted(self, digest: str) -> Optional[tuple]:
+        """Key under which ``digest`` is remembered as verified; None when there is no key."""
+        if self.public_key_path is None:
+            return None
+        return digest, file_digest(self.public_key_path, use_cache=False)
+
+    def reload(self) -> bool:
+        """
+        Load the artifact at ``model_path`` if its digest changed. Returns
+        True when a new model was swapped in. A model that fails verification
+        is rejected and the current one keeps serving; with no current model
+        a ValueError is raised.
+        """
+        with self._lock:
+            self._stamp = self._file_stamp()
+            data, digest = read_artifact(self.model_path)
+            if self._active is not None and digest == self._active[1]:
+                return False
+            key = self._trusted(digest)
+            verify = key is not None and key not in self._verified
+            if verify:
+                self.verifications += 1
+            try:
+                model = load_verified(
+                    data,
+                    digest,
+                    self.loader,
+                    self.public_key_path if verify else None,
+                    self.signature_path,
+                )
+            except SignatureError as exc:
+                self.rejected += 1
+                self.last_error = str(exc)
+                if self._active is None:
+                    raise
+                return False
+            if key is not None:
+                self._verified.add(key)
+            self._active = (model, digest)
+            self.reloads += 1
+            self.last_error = None
+            return True
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            if self._file_stamp() == self._stamp:
+                continue
+            try:
+                self.reload()
+            except Exception as exc:
+                self.last_error = str(exc)
+
+    def start(self) -> "ModelManager":
+        """Load the current model, then watch for new ones in the background."""
+        self.reload()
+        if self._thread is None and self.poll_interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="model-manager", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def status(self) -> dict:
+        return {
+            "model_path": str(self.model_path),
+            "digest": None if self._active is None else self._active[1],
+            "verified": self.public_key_path is not None,
+            "reloads": self.reloads,
+            "verifications": self.verifications,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+        }
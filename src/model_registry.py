@@ -0,0 +1,197 @@
+import argparse
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from src.model_manager import load_verified, read_artifact
+from src.utils import ROOT, load_model
+
+
+MLRUNS_DIR = ROOT / "mlruns"
+DEFAULT_MAX_MODELS = 8
+# Signature of a logged model, next to its model.pkl (``security.model_sign sign --signature-path``).
+SIGNATURE_NAME = "model.sig"
+_MODEL_REF = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def _mlmodel_field(path: Path, field: str) -> Optional[str]:
+    prefix = f"{field}:"
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith(prefix):
+                return line[len(prefix):].strip().strip("'\"")
+    return None
+
+
+def list_models(mlruns_dir: Path = MLRUNS_DIR) -> List[Dict[str, Any]]:
+    """Logged models under ``mlruns_dir`` with their run, newest first."""
+    models = []
+    for mlmodel in Path(mlruns_dir).glob("*/models/*/artifacts/MLmodel"):
+        path = mlmodel.with_name("model.pkl")
+        if not path.exists():
+            continue
+        models.append(
+            {
+                "model_id": mlmodel.parent.parent.name,
+                "run_id": _mlmodel_field(mlmodel, "run_id"),
+                "experiment_id": mlmodel.parents[3].name,
+                "path": str(path),
+                "size_bytes": path.stat().st_size,
+                "signed": path.with_name(SIGNATURE_NAME).exists(),
+                "mtime": path.stat().st_mtime,
+            }
+        )
+    return sorted(models, key=lambda m: m["mtime"], reverse=True)
+
+
+def resolve_model_path(model_ref: str, mlruns_dir: Path = MLRUNS_DIR) -> Path:
+    """
+    Pickle of an MLflow model ID (``mlruns/<exp>/models/<id>``) or of the
+    newest model logged by a run ID, including the older
+    ``mlruns/<exp>/<run>/artifacts/model`` layout.
+    """
+    if not _MODEL_REF.match(model_ref):
+        raise ValueError(f"Invalid model reference: {model_ref!r}")
+    mlruns_dir = Path(mlruns_dir)
+    for path in mlruns_dir.glob(f"*/models/{model_ref}/artifacts/model.pkl"):
+        return path
+    for model in list_models(mlruns_dir):
+        if model["run_id"] == model_ref:
+            return Path(model["path"])
+    for path in mlruns_dir.glob(f"*/{model_ref}/artifacts/model/model.pkl"):
+        return path
+    raise KeyError(f"No logged model for {model_ref!r} under {mlruns_dir}")
+
+
+class ModelRegistry:
+    """
+    Thread-safe LRU of loaded models keyed by MLflow model or run ID. At most
+    ``max_models`` models and, when set, ``max_bytes`` of pickled model size
+    stay resident; the least recently used are evicted first. A model larger
+    than ``max_bytes`` on its own is returned but not kept. Concurrent
+    requests for a model that is loading wait for the one load. ``loader``
+    receives the model file's bytes as a file object; with
+    ``public_key_path`` those bytes are only unpickled once its
+    ``model.sig`` verifies them, and unsigned models raise SignatureError.
+    """
+
+    def __init__(
+        self,
+        max_models: Optional[int] = DEFAULT_MAX_MODELS,
+        max_bytes: Optional[int] = None,
+        mlruns_dir: Path = MLRUNS_DIR,
+        loader: Callable = load_model,
+        public_key_path: Optional[Path] = None,
+    ):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.mlruns_dir = Path(mlruns_dir)
+        self.loader = loader
+        self.public_key_path = None if public_key_path is None else Path(public_key_path)
+        self._entries: "OrderedDict[Path, tuple]" = OrderedDict()
+        self._paths: Dict[str, Path] = {}
+        self._loading: Dict[Path, Future] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def resolve(self, model_ref: str) -> Path:
+        path = self._paths.get(model_ref)
+        if path is None or not path.exists():
+            path = resolve_model_path(model_ref, self.mlruns_dir)
+            self._paths[model_ref] = path
+        return path
+
+    def _load(self, path: Path):
+        data, digest = read_artifact(path)
+        model = load_verified(data, digest, self.loader, self.public_key_path, path.with_name(SIGNATURE_NAME))
+        return model, len(data)
+
+    def _evict(self) -> None:
+        while self._entries and (
+            (self.max_models is not None and len(self._entries) > self.max_models)
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            _, (_, size) = self._entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def get(self, model_ref: str):
+        # Run and model IDs of the same model share one entry.
+        path = self.resolve(model_ref)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            future = self._loading.get(path)
+            owner = future is None
+            if owner:
+                future = self._loading[path] = Future()
+        if not owner:
+            return future.result()
+        try:
+            start = time.perf_counter()
+            model, size = self._load(path)
+        except BaseException as exc:
+            with self._lock:
+                del self._loading[path]
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self.load_seconds += time.perf_counter() - start
+            del self._loading[path]
+            if self.max_bytes is None or size <= self.max_bytes:
+                self._entries[path] = (model, size)
+                self.bytes += size
+                self._evict()
+        future.set_result(model)
+        return model
+
+    def __contains__(self, model_ref: str) -> bool:
+        path = self._paths.get(model_ref)
+        return path is not None and path in self._entries
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "models": len(self._entries),
+            "bytes": self.bytes,
+            "max_models": self.max_models,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": float(self.hits / total) if total else 0.0,
+            "load_seconds": self.load_seconds,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="List or resolve models logged under mlruns/.")
+    parser.add_argument("model_ref", nargs="?", help="MLflow model or run ID to resolve.")
+    parser.add_argument("--mlruns", type=str, default=str(MLRUNS_DIR))
+    args = parser.parse_args()
+    if args.model_ref is None:
+        print(json.dumps(list_models(Path(args.mlruns)), indent=2))
+    else:
+        print(resolve_model_path(args.model_ref, Path(args.mlruns)))
+
+
+if __name__ == "__main__":
+    main()
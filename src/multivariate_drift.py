@@ -0,0 +1,191 @@
+from typing import Dict
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+from threadpoolctl import threadpool_limits
+
+
+MULTIVARIATE_TESTS = ("mmd", "classifier")
+DEFAULT_ALPHA = 0.01
+
+
+def _subsample(X: np.ndarray, size: int, rng: np.random.Generator) -> np.ndarray:
+    if len(X) <= size:
+        return X
+    return X[np.sort(rng.choice(len(X), size, replace=False))]
+
+
+def _standardize(X_ref: np.ndarray, X_cur: np.ndarray):
+    mean = X_ref.mean(axis=0)
+    std = X_ref.std(axis=0)
+    std[std == 0] = 1.0
+    return (X_ref - mean) / std, (X_cur - mean) / std
+
+
+def _replicate_seeds(n_replicates: int, n_jobs: int, seed: int):
+    """Split ``n_replicates`` into one independently seeded block per job."""
+    n_blocks = max(1, min(n_replicates, n_jobs if n_jobs > 0 else 8))
+    sizes = np.full(n_blocks, n_replicates // n_blocks)
+    sizes[: n_replicates % n_blocks] += 1
+    seeds = np.random.SeedSequence(seed).spawn(n_blocks)
+    return list(zip(sizes.tolist(), seeds))
+
+
+def _p_value(statistic: float, null: np.ndarray) -> float:
+    return float((1 + np.sum(null >= statistic)) / (1 + len(null)))
+
+
+def median_bandwidth(X: np.ndarray, max_samples: int = 1000, seed: int = 0) -> float:
+    """Median pairwise distance of (a subsample of) ``X``."""
+    X = _subsample(X, max_samples, np.random.default_rng(seed))
+    sq = np.sum(X ** 2, axis=1)
+    d2 = sq[:, None] + sq[None, :] - 2.0 * X @ X.T
+    d2 = d2[np.triu_indices(len(X), k=1)]
+    d2 = d2[d2 > 0]
+    return float(np.sqrt(np.median(d2))) if d2.size else 1.0
+
+
+def random_fourier_features(
+    X: np.ndarray,
+    n_features: int = 256,
+    bandwidth: float = 1.0,
+    seed: int = 0,
+) -> np.ndarray:
+    """Random Fourier features approximating a Gaussian kernel of ``bandwidth``."""
+    rng = np.random.default_rng(seed)
+    W = rng.normal(scale=1.0 / bandwidth, size=(X.shape[1], n_features))
+    b = rng.uniform(0.0, 2.0 * np.pi, size=n_features)
+    return np.sqrt(2.0 / n_features) * np.cos(X @ W + b)
+
+
+def _mmd_null(phi: np.ndarray, n_ref: int, n_permutations: int, seed) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    total = phi.sum(axis=0)
+    n_cur = len(phi) - n_ref
+    null = np.empty(n_permutations)
+    for i in range(n_permutations):
+        ref_sum = phi[rng.permutation(len(phi))[:n_ref]].sum(axis=0)
+        diff = ref_sum / n_ref - (total - ref_sum) / n_cur
+        null[i] = diff @ diff
+    return null
+
+
+def mmd_test(
+    X_ref: np.ndarray,
+    X_cur: np.ndarray,
+    n_features: int = 256,
+    n_permutations: int = 200,
+    max_samples: int = 20_000,
+    alpha: float = DEFAULT_ALPHA,
+    n_jobs: int = -1,
+    seed: int = 42,
+) -> Dict:
+    """
+    Linear-time MMD two-sample test. Both samples are mapped once to random
+    Fourier features of a Gaussian kernel (median-heuristic bandwidth); the
+    statistic is the squared distance of their mean embeddings and its null
+    distribution comes from label permutations run in parallel blocks.
+    """
+    rng = np.random.default_rng(seed)
+    X_ref = _subsample(np.asarray(X_ref, dtype=float), max_samples, rng)
+    X_cur = _subsample(np.asarray(X_cur, dtype=float), max_samples, rng)
+    X_ref, X_cur = _standardize(X_ref, X_cur)
+    bandwidth = median_bandwidth(np.vstack([X_ref, X_cur]), seed=seed)
+    phi = random_fourier_features(np.vstack([X_ref, X_cur]), n_features, bandwidth, seed)
+    n_ref = len(X_ref)
+    diff = phi[:n_ref].mean(axis=0) - phi[n_ref:].mean(axis=0)
+    statistic = float(diff @ diff)
+    null = np.concatenate(
+        Parallel(n_jobs=n_jobs)(
+            delayed(_mmd_null)(phi, n_ref, size, block_seed)
+            for size, block_seed in _replicate_seeds(n_permutations, n_jobs, seed)
+        )
+    )
+    p_value = _p_value(statistic, null)
+    return {
+        "statistic": statistic,
+        "p_value": p_value,
+        "bandwidth": bandwidth,
+        "n_features": n_features,
+        "n_permutations": n_permutations,
+        "n_reference": n_ref,
+        "n_current": len(X_cur),
+        "drift_detected": bool(p_value < alpha),
+    }
+
+
+def _auc_null(y: np.ndarray, scores: np.ndarray, n_permutations: int, seed) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.array([roc_auc_score(rng.permutation(y), scores) for _ in range(n_permutations)])
+
+
+def classifier_test(
+    X_ref: np.ndarray,
+    X_cur: np.ndarray,
+    max_samples: int = 5_000,
+    n_permutations: int = 200,
+    test_fraction: float = 0.5,
+    alpha: float = DEFAULT_ALPHA,
+    n_jobs: int = -1,
+    seed: int = 42,
+) -> Dict:
+    """
+    Classifier two-sample test: a gradient-boosted classifier learns to tell
+    reference rows from current rows on balanced subsamples of at most
+    ``max_samples`` each. The statistic is its ROC AUC on a held-out split.
+    Held-out scores do not depend on held-out labels under the null, so
+    permuting those labels against the scores gives an exact p-value.
+    """
+    rng = np.random.default_rng(seed)
+    size = min(len(X_ref), len(X_cur), max_samples)
+    X_ref = _subsample(np.asarray(X_ref, dtype=float), size, rng)
+    X_cur = _subsample(np.asarray(X_cur, dtype=float), size, rng)
+    X = np.vstack([X_ref, X_cur])
+    y = np.concatenate([np.zeros(len(X_ref)), np.ones(len(X_cur))])
+    X_fit, X_held, y_fit, y_held = train_test_split(
+        X, y, test_size=test_fraction, stratify=y, random_state=seed
+    )
+    model = HistGradientBoostingClassifier(max_iter=100, random_state=seed)
+    # Boosting uses OpenMP threads; keep them within the same worker budget.
+    with threadpool_limits(limits=n_jobs if n_jobs > 0 else None, user_api="openmp"):
+        model.fit(X_fit, y_fit)
+    scores = model.predict_proba(X_held)[:, 1]
+    auc = float(roc_auc_score(y_held, scores))
+    null = np.concatenate(
+        Parallel(n_jobs=n_jobs)(
+            delayed(_auc_null)(y_held, scores, block_size, block_seed)
+            for block_size, block_seed in _replicate_seeds(n_permutations, n_jobs, seed)
+        )
+    )
+    p_value = _p_value(auc, null)
+    return {
+        "auc": auc,
+        "p_value": p_value,
+        "n_permutations": n_permutations,
+        "n_per_sample": size,
+        "drift_detected": bool(p_value < alpha),
+    }
+
+
+def multivariate_drift(
+    X_ref: np.ndarray,
+    X_cur: np.ndarray,
+    tests=MULTIVARIATE_TESTS,
+    alpha: float = DEFAULT_ALPHA,
+    n_jobs: int = -1,
+    seed: int = 42,
+) -> Dict:
+    results = {}
+    for name in tests:
+        if name == "mmd":
+            results[name] = mmd_test(X_ref, X_cur, alpha=alpha, n_jobs=n_jobs, seed=seed)
+        elif name == "classifier":
+            results[name] = classifier_test(X_ref, X_cur, alpha=alpha, n_jobs=n_jobs, seed=seed)
+        else:
+            raise ValueError(f"Unknown multivariate drift test: {name}")
+    results["alpha"] = alpha
+    results["drift_detected"] = any(results[name]["drift_detected"] for name in tests)
+    return results
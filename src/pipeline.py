@@ -0,0 +1,225 @@
+import argparse
+from typing import Any, Dict, List, Optional
+
+from src import (
+    adversarial_tests,
+    blackbox_attacks,
+    concept_drift,
+    drift_monitor,
+    evaluate,
+    fairness_evaluation,
+    giskard_tests,
+    leakage,
+    membership_inference,
+    model_card,
+    poisoning_detection,
+    preprocessing,
+    security_audit,
+    train,
+)
+from src.context import PipelineContext, resolve_context
+from src.scheduler import Stage, run_stages
+from src.stage_cache import StageCache
+from src.utils import REPORTS_DIR, save_json
+
+
+DATA = ("dvc/data/train.csv", "dvc/data/test.csv")
+MODEL = ("dvc/models/model.pkl",)
+LINEAR_SCORER = ("dvc/models/linear_scorer.npz",)
+REFERENCE_PROFILE = ("dvc/models/reference_profile.json", "dvc/models/reference_sketches.json")
+
+
+def _preprocess_stage(ctx: PipelineContext) -> None:
+    preprocessing.preprocess(ctx)
+
+
+def _model_card_stage(ctx: PipelineContext) -> None:
+    model_card.main()
+
+
+STAGES = {
+    stage.name: stage
+    for stage in (
+        Stage("preprocess", _preprocess_stage, outs=DATA),
+        Stage("train", train.train, deps=DATA, outs=MODEL + LINEAR_SCORER + REFERENCE_PROFILE),
+        Stage(
+            "evaluate",
+            evaluate.evaluate,
+            deps=DATA + MODEL + ("src/evaluate.py",),
+            outs=("dvc/models/metrics.json", "reports/baseline_predictions.json"),
+            cache=True,
+        ),
+        Stage(
+            "fairness",
+            fairness_evaluation.run_fairness,
+            deps=DATA + MODEL + ("src/fairness_evaluation.py",),
+            outs=("reports/fairness_metrics.json",),
+            allow_failure=True,
+            cache=True,
+        ),
+        Stage(
+            "giskard",
+            giskard_tests.run_giskard_scan,
+            deps=DATA + MODEL + ("src/giskard_tests.py",),
+            outs=(
+                "reports/giskard/giskard_status.json",
+                "reports/giskard/scan.json",
+                "reports/giskard/scan.html",
+            ),
+            allow_failure=True,
+            cache=True,
+        ),
+        Stage(
+            "adversarial",
+            adversarial_tests.run_adversarial_tests,
+            deps=DATA + MODEL + ("src/adversarial_tests.py", "src/attack_engine.py"),
+            outs=("reports/adversarial_metrics.json",),
+            cache=True,
+        ),
+        Stage(
+            "blackbox",
+            blackbox_attacks.run_blackbox_attacks,
+            deps=DATA + MODEL + ("src/blackbox_attacks.py",),
+            outs=("reports/blackbox_metrics.json",),
+            cache=True,
+        ),
+        Stage(
+            "membership",
+            membership_inference.run_membership_inference,
+            deps=DATA + MODEL + ("src/membership_inference.py",),
+            outs=("reports/membership_inference.json",),
+            cache=True,
+        ),
+        Stage(
+            "leakage",
+            leakage.detect_leakage,
+            deps=DATA + ("src/leakage.py",),
+            outs=("reports/leakage.json",),
+            cache=True,
+        ),
+        Stage(
+            "poisoning",
+            poisoning_detection.detect_poisoning,
+            deps=DATA + ("src/poisoning_detection.py",),
+            outs=("reports/poisoning_risk.json", "reports/label_suspicion.csv"),
+            cache=True,
+        ),
+        Stage(
+            "drift",
+            drift_monitor.monitor_drift,
+            deps=DATA + REFERENCE_PROFILE + (
+                "src/drift_monitor.py",
+                "src/quantile_sketch.py",
+                "src/multivariate_drift.py",
+            ),
+            outs=("reports/drift_metrics.json",),
+            cache=True,
+        ),
+        Stage(
+            "concept_drift",
+            concept_drift.monitor_concept_drift,
+            deps=("reports/baseline_predictions.json", "src/concept_drift.py"),
+            outs=("reports/concept_drift.json",),
+            cache=True,
+        ),
+        Stage(
+            "security_audit",
+            security_audit.run_audit,
+            deps=DATA + MODEL + security_audit.AUDIT_INPUTS + security_audit.AUDIT_SOURCES,
+            outs=security_audit.AUDIT_OUTPUTS,
+            cache=True,
+            env=True,
+        ),
+        Stage(
+            "model_card",
+            _model_card_stage,
+            deps=(
+                "dvc/models/metrics.json",
+                "reports/adversarial_metrics.json",
+                "reports/poisoning_risk.json",
+                "reports/drift_metrics.json",
+                "reports/fairness_metrics.json",
+                "reports/giskard/giskard_status.json",
+                "reports/sbom_cyclonedx.json",
+            ),
+            outs=("model_card.md",),
+        ),
+    )
+}
+
+DEFAULT_STAGES = [name for name in STAGES if name != "model_card"]
+
+
+def run_pipeline(
+    stages: Optional[List[str]] = None,
+    ctx: PipelineContext = None,
+    max_workers: Optional[int] = 1,
+    executor: str = "process",
+    cache: Optional[StageCache] = None,
+) -> Dict[str, Any]:
+    ctx = resolve_context(ctx)
+    if stages is None:
+        stages = DEFAULT_STAGES
+    unknown = [name for name in stages if name not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown pipeline stages: {', '.join(unknown)}")
+
+    run = run_stages(
+        [STAGES[name] for name in stages],
+        ctx,
+        max_workers=max_workers,
+        executor=executor,
+        cache=cache,
+    )
+    summary = run.summary()
+    summary["max_workers"] = max_workers
+    if cache is not None:
+        summary["stage_cache"] = cache.stats()
+    save_json(REPORTS_DIR / "pipeline_run.json", summary)
+    run.raise_for_failures()
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run MLSecOps pipeline stages.")
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=list(STAGES),
+        default=DEFAULT_STAGES,
+        help="Stages to run; dependencies between selected stages are respected.",
+    )
+    parser.add_argument(
+        "--dtype",
+        choices=["float32", "float64"],
+        default=None,
+        help="Feature dtype served from the binary dataset cache.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Stages to run concurrently; 1 runs everything in this interpreter.",
+    )
+    parser.add_argument(
+        "--executor",
+        choices=["process", "thread"],
+        default="process",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Recompute every stage instead of restoring unchanged results.",
+    )
+    args = parser.parse_args()
+    run_pipeline(
+        args.stages,
+        PipelineContext(dtype=args.dtype),
+        max_workers=args.workers,
+        executor=args.executor,
+        cache=StageCache(enabled=not args.no_cache),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,310 @@
+import argparse
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import joblib
 import numpy as np
+import pandas as pd
 from sklearn.ensemble import IsolationForest
+from sklearn.neighbors import NearestNeighbors
+from sklearn.random_projection import GaussianRandomProjection
 import mlflow
 
+from src.context import PipelineContext, resolve_context
 from src.utils import (
-    load_train_test_data,
-    configure_mlflow,
+    CACHE_DIR,
+    as_chunks,
+    ensure_dir,
+    load_json,
+    sample_chunks,
     save_json,
     REPORTS_DIR,
 )
 
 
-def detect_poisoning() -> dict:
-    X_train, X_test, y_train, y_test = load_train_test_data()
-    model = IsolationForest(
-        n_estimators=200,
-        contamination=0.05,
-        random_state=42,
+DEFAULT_SAMPLE_SIZE = 100_000
+DEFAULT_REFIT_THRESHOLD = 0.1
+DETECTOR_CACHE_DIR = CACHE_DIR / "poisoning"
+DETECTOR_PARAMS = {"n_estimators": 200, "contamination": 0.05, "random_state": 42}
+LABEL_NEIGHBOURS = 10
+# Rows whose neighbours mostly carry another label are flagged.
+LABEL_SUSPICION_THRESHOLD = 0.5
+# Above this many features exact trees degrade, so rows are projected first.
+_EXACT_INDEX_MAX_FEATURES = 64
+_PROJECTION_DIM = 32
+_QUERY_BATCH_SIZE = 8192
+
+
+def _row_bytes(X: pd.DataFrame) -> bytes:
+    return np.ascontiguousarray(X.to_numpy(dtype=np.float64)).tobytes()
+
+
+def fingerprint_rows(chunks, prefix_rows: int = 0):
+    """
+    One pass over ``chunks`` returning the total row count, the SHA-256 of
+    the first ``prefix_rows`` rows and the SHA-256 of all rows. Rows are
+    hashed as float64 so the digest does not depend on the storage dtype.
+    """
+    h = hashlib.sha256()
+    prefix_digest = h.hexdigest() if prefix_rows == 0 else None
+    n_rows = 0
+    for X, _ in chunks:
+        if n_rows < prefix_rows < n_rows + len(X):
+            cut = prefix_rows - n_rows
+            h.update(_row_bytes(X.iloc[:cut]))
+            prefix_digest = h.hexdigest()
+            h.update(_row_bytes(X.iloc[cut:]))
+        else:
+            h.update(_row_bytes(X))
+        n_rows += len(X)
+        if n_rows == prefix_rows:
+            prefix_digest = h.hexdigest()
+    return n_rows, prefix_digest, h.hexdigest()
+
+
+def _detector_path(fit_sha256: str, root: Path = None) -> Path:
+    return (root or DETECTOR_CACHE_DIR) / f"{fit_sha256}.joblib"
+
+
+def _state_path(root: Path = None) -> Path:
+    return (root or DETECTOR_CACHE_DIR) / "state.json"
+
+
+def load_detector_state(root: Path = None) -> Optional[dict]:
+    path = _state_path(root)
+    if not path.exists():
+        return None
+    state = load_json(path)
+    if not _detector_path(state["fit_sha256"], root).exists():
+        return None
+    return state
+
+
+def _save_detector(model: IsolationForest, fit_sha256: str, root: Path = None) -> None:
+    path = _detector_path(fit_sha256, root)
+    ensure_dir(path.parent)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    joblib.dump(model, tmp)
+    os.replace(tmp, path)
+
+
+def _score_rows(model: IsolationForest, chunks, skip_rows: int = 0) -> dict:
+    """Aggregate anomaly scores of every row after the first ``skip_rows``."""
+    totals = {"n_rows": 0, "n_outliers": 0, "score_sum": 0.0, "max_score": -np.inf}
+    offset = 0
+    for X, _ in chunks:
+        start = max(0, skip_rows - offset)
+        offset += len(X)
+        if start >= len(X):
+            continue
+        # predict() is decision_function() < 0; score once and derive both.
+        decision = model.decision_function(X.iloc[start:])
+        totals["n_rows"] += len(decision)
+        totals["n_outliers"] += int(np.sum(decision < 0))
+        totals["score_sum"] += float(np.sum(-decision))
+        totals["max_score"] = max(totals["max_score"], float(np.max(-decision)))
+    return totals
+
+
+class LabelConsistencyIndex:
+    """
+    Nearest-neighbour index over standardised reference rows and their labels.
+    A KD-tree is used up to 32 features and a ball tree up to
+    ``_EXACT_INDEX_MAX_FEATURES``; wider data is first reduced with a Gaussian
+    random projection, making the neighbours approximate.
+    """
+
+    def __init__(self, X: pd.DataFrame, y, k: int = LABEL_NEIGHBOURS, n_jobs: int = -1, random_state: int = 42):
+        X = np.asarray(X, dtype=float)
+        self.k = min(k, len(X) - 1)
+        self.labels = np.asarray(y)
+        self.mean = X.mean(axis=0)
+        self.std = X.std(axis=0)
+        self.std[self.std == 0] = 1.0
+        self.projection = None
+        Z = (X - self.mean) / self.std
+        if Z.shape[1] > _EXACT_INDEX_MAX_FEATURES:
+            self.projection = GaussianRandomProjection(_PROJECTION_DIM, random_state=random_state).fit(Z)
+            Z = self.projection.transform(Z)
+        self.algorithm = "kd_tree" if Z.shape[1] <= _PROJECTION_DIM else "ball_tree"
+        self.index = NearestNeighbors(n_neighbors=self.k + 1, algorithm=self.algorithm, n_jobs=n_jobs).fit(Z)
+
+    def _transform(self, X) -> np.ndarray:
+        Z = (np.asarray(X, dtype=float) - self.mean) / self.std
+        return Z if self.projection is None else self.projection.transform(Z)
+
+    def suspicion(self, X, y) -> np.ndarray:
+        """
+        Share of each row's k nearest reference rows whose label differs from
+        its own. One zero-distance match (the row itself, or an exact
+        duplicate) is left out.
+        """
+        X = np.asarray(X, dtype=float)
+        scores = np.empty(len(X))
+        y = np.asarray(y)
+        for start in range(0, len(X), _QUERY_BATCH_SIZE):
+            Z = self._transform(X[start:start + _QUERY_BATCH_SIZE])
+            dist, idx = self.index.kneighbors(Z)
+            self_match = dist[:, 0] == 0
+            neighbours = np.where(self_match[:, None], idx[:, 1:], idx[:, :-1])
+            batch_y = y[start:start + _QUERY_BATCH_SIZE]
+            scores[start:start + len(Z)] = np.mean(self.labels[neighbours] != batch_y[:, None], axis=1)
+        return scores
+
+
+def scan_label_consistency(
+    chunks,
+    k: int = LABEL_NEIGHBOURS,
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+    n_jobs: int = -1,
+    top_n: int = 20,
+) -> dict:
+    """
+    Score every row of ``chunks`` for label-flip poisoning against an index
+    built once on (a bounded sample of) the same rows.
+    """
+    X_ref, y_ref = sample_chunks(chunks, sample_size, return_labels=True)
+    index = LabelConsistencyIndex(X_ref, y_ref, k=k, n_jobs=n_jobs)
+    scores, labels = [], []
+    for X, y in chunks:
+        scores.append(index.suspicion(X, y))
+        labels.append(np.asarray(y))
+    scores = np.concatenate(scores)
+    labels = np.concatenate(labels)
+    flagged = scores > LABEL_SUSPICION_THRESHOLD
+    top = np.argsort(-scores, kind="stable")[:top_n]
+    return {
+        "scores": scores,
+        "labels": labels,
+        "summary": {
+            "k": index.k,
+            "index": index.algorithm if index.projection is None else f"{index.algorithm}+random_projection",
+            "flagged_fraction": float(flagged.mean()),
+            "mean_suspicion": float(scores.mean()),
+            "label_flip_risk": float(min(1.0, flagged.mean() * 2.0)),
+            "top_suspicious_rows": [{"row": int(i), "label": int(labels[i]), "suspicion": float(scores[i])} for i in top],
+        },
+    }
+
+
+def detect_poisoning(
+    ctx: PipelineContext = None,
+    train_data=None,
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+    incremental: bool = True,
+    refit_threshold: float = DEFAULT_REFIT_THRESHOLD,
+    n_jobs: Optional[int] = None,
+    cache_dir: Path = None,
+    label_check: bool = True,
+) -> dict:
+    """
+    Fit the anomaly detector on (a bounded sample of) the training data and
+    score every row. ``train_data`` may be an (X, y) pair or a re-iterable
+    chunk stream such as ``src.utils.DataChunks("train")``.
+
+    The fitted forest is saved under the hash of the rows it was fitted on.
+    With ``incremental``, a training set that only gained rows since the last
+    run is scored on the appended rows alone against the saved forest, until
+    the rows appended since the fit exceed ``refit_threshold`` of the fitted
+    rows. ``label_check`` adds the kNN label-consistency scan; per-row
+    suspicion scores go to ``reports/label_suspicion.csv``.
+    """
+    ctx = resolve_context(ctx)
+    n_jobs = ctx.worker_budget(n_jobs)
+    if train_data is None:
+        X_train, y_train = ctx.split("train")
+        train_data = (X_train, y_train)
+    chunks = as_chunks(train_data)
+    params = {**DETECTOR_PARAMS, "sample_size": sample_size}
+    state = load_detector_state(cache_dir) if incremental else None
+    if state is not None and state["params"] != params:
+        state = None
+    n_rows, prefix_sha256, data_sha256 = fingerprint_rows(
+        chunks, prefix_rows=state["scored_rows"] if state else 0
+    )
+    mode = "full"
+    if state is not None and prefix_sha256 == state["scored_sha256"] and n_rows >= state["scored_rows"]:
+        appended_since_fit = n_rows - state["fit_rows"]
+        if appended_since_fit <= refit_threshold * state["fit_rows"]:
+            mode = "incremental"
+    if mode == "incremental":
+        model = joblib.load(_detector_path(state["fit_sha256"], cache_dir))
+        model.set_params(n_jobs=n_jobs)
+        new = _score_rows(model, chunks, skip_rows=state["scored_rows"])
+        totals = dict(state["totals"])
+        totals["n_rows"] += new["n_rows"]
+        totals["n_outliers"] += new["n_outliers"]
+        totals["score_sum"] += new["score_sum"]
+        totals["max_score"] = max(totals["max_score"], new["max_score"])
+        fit_sha256, fit_rows = state["fit_sha256"], state["fit_rows"]
+        rows_scored = new["n_rows"]
+    else:
+        model = IsolationForest(n_jobs=n_jobs, **DETECTOR_PARAMS)
+        model.fit(sample_chunks(chunks, sample_size))
+        totals = _score_rows(model, chunks)
+        fit_sha256, fit_rows = data_sha256, n_rows
+        rows_scored = n_rows
+        _save_detector(model, fit_sha256, cache_dir)
+    save_json(
+        _state_path(cache_dir),
+        {
+            "params": params,
+            "fit_sha256": fit_sha256,
+            "fit_rows": fit_rows,
+            "scored_sha256": data_sha256,
+            "scored_rows": n_rows,
+            "totals": totals,
+        },
     )
-    model.fit(X_train)
-    scores = -model.decision_function(X_train)
-    labels = model.predict(X_train)
-    outlier_fraction = float(np.mean(labels == -1))
-    mean_score = float(np.mean(scores))
-    max_score = float(np.max(scores))
+    outlier_fraction = float(totals["n_outliers"] / totals["n_rows"])
+    mean_score = float(totals["score_sum"] / totals["n_rows"])
+    max_score = float(totals["max_score"])
     risk_score = float(min(1.0, outlier_fraction * 2.0 + max_score / 10.0))
     metrics = {
         "outlier_fraction": outlier_fraction,
         "mean_anomaly_score": mean_score,
         "max_anomaly_score": max_score,
         "poisoning_risk_score": risk_score,
+        "scan_mode": mode,
+        "rows_scored": rows_scored,
+        "detector_sha256": fit_sha256,
     }
+    if label_check:
+        labels = scan_label_consistency(chunks, sample_size=sample_size, n_jobs=n_jobs)
+        metrics["label_consistency"] = labels["summary"]
+        metrics["label_flip_risk"] = labels["summary"]["label_flip_risk"]
+        ensure_dir(REPORTS_DIR)
+        pd.DataFrame({"label": labels["labels"], "suspicion": labels["scores"]}).to_csv(
+            REPORTS_DIR / "label_suspicion.csv", index_label="row"
+        )
     path = REPORTS_DIR / "poisoning_risk.json"
     save_json(path, metrics)
-    configure_mlflow()
-    with mlflow.start_run(run_name="poisoning_detection"):
+    ctx.configure_mlflow()
+    with ctx.start_run(run_name="poisoning_detection"):
         for k, v in metrics.items():
-            mlflow.log_metric(k, v)
+            if isinstance(v, (int, float)) and not isinstance(v, bool):
+                mlflow.log_metric(k, v)
+        mlflow.log_param("scan_mode", mode)
         mlflow.log_artifact(str(path), artifact_path="poisoning_detection")
     return metrics
 
 
 def main() -> None:
-    detect_poisoning()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="Refit and rescore every row.")
+    parser.add_argument("--refit-threshold", type=float, default=DEFAULT_REFIT_THRESHOLD)
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--no-label-check", action="store_true")
+    args = parser.parse_args()
+    detect_poisoning(
+        incremental=not args.full,
+        refit_threshold=args.refit_threshold,
+        n_jobs=args.jobs,
+        label_check=not args.no_label_check,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,41 @@
+import os
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from src.utils import CACHE_DIR, ensure_dir
+
+
+PREDICTION_CACHE_DIR = CACHE_DIR / "predictions"
+
+
+def prediction_path(model_hash: str, data_key: str, method: str, root: Path = None) -> Path:
+    root = Path(root) if root is not None else PREDICTION_CACHE_DIR
+    return root / model_hash / f"{data_key}.{method}.npy"
+
+
+def cached_predict(
+    model,
+    X,
+    method: str,
+    model_hash: Optional[str],
+    data_key: Optional[str],
+    root: Path = None,
+) -> np.ndarray:
+    """
+    ``getattr(model, method)(X)`` backed by a memory-mapped ``.npy`` keyed by
+    (model hash, dataset key, method). Without both keys nothing is persisted.
+    """
+    if model_hash is None or data_key is None:
+        return np.asarray(getattr(model, method)(X))
+    path = prediction_path(model_hash, data_key, method, root)
+    if not path.exists():
+        predictions = np.asarray(getattr(model, method)(X))
+        ensure_dir(path.parent)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        with tmp.open("wb") as f:
+            np.save(f, predictions)
+        os.replace(tmp, path)
+    return np.load(path, mmap_mode="r")
@@ -1,8 +1,13 @@
-from src.utils import load_train_test_data
+from src.context import PipelineContext, resolve_context
+
+
+def preprocess(ctx: PipelineContext = None):
+    ctx = resolve_context(ctx)
+    return ctx.data
 
 
 def main() -> None:
-    load_train_test_data()
+    preprocess()
 
 
 if __name__ == "__main__":
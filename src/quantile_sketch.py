@@ -0,0 +1,185 @@
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class KLLSketch:
+    """
+    Mergeable KLL quantile sketch over a stream of floats. Memory is
+    O(k log(n / k)) items; rank queries are accurate to roughly 1.7 / k of n.
+    Level ``h`` holds items of weight ``2 ** h``.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        if k < 8:
+            raise ValueError("k must be at least 8")
+        self.k = k
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(8, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _size(self) -> int:
+        return sum(level.size for level in self.levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def _compress(self) -> None:
+        while self._size() > self._max_size():
+            for h, items in enumerate(self.levels):
+                if items.size >= self._capacity(h):
+                    break
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            # An odd leftover item stays behind at its level.
+            keep = items[: items.size % 2]
+            pairs = items[items.size % 2:]
+            promoted = pairs[int(self._rng.integers(2))::2]
+            self.levels[h] = keep
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+
+    def update(self, values) -> "KLLSketch":
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        self.n += int(values.size)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        if other.k != self.k:
+            raise ValueError("Cannot merge sketches with different k")
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _weighted(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate(
+            [np.full(level.size, 2.0 ** h) for h, level in enumerate(self.levels)]
+        )
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def rank(self, values, inclusive: bool = False) -> np.ndarray:
+        """Estimated number of items < ``values`` (<= when ``inclusive``)."""
+        values = np.asarray(values, dtype=float)
+        items, cumulative = self._weighted()
+        if items.size == 0:
+            return np.zeros(values.shape)
+        idx = np.searchsorted(items, values, side="right" if inclusive else "left")
+        ranks = np.where(idx > 0, cumulative[np.maximum(idx - 1, 0)], 0.0)
+        # Weights only approximate n; rescale so the full range maps to n.
+        return ranks * (self.n / cumulative[-1])
+
+    def quantile(self, qs) -> np.ndarray:
+        qs = np.asarray(qs, dtype=float)
+        items, cumulative = self._weighted()
+        if items.size == 0:
+            return np.full(qs.shape, np.nan)
+        targets = qs * cumulative[-1]
+        idx = np.minimum(np.searchsorted(cumulative, targets, side="left"), items.size - 1)
+        out = items[idx]
+        # Pin the extremes to the exact observed range.
+        out = np.where(qs <= 0.0, self.min, out)
+        return np.where(qs >= 1.0, self.max, out)
+
+    def to_dict(self) -> Dict:
+        return {
+            "k": self.k,
+            "n": self.n,
+            "min": self.min if self.n else None,
+            "max": self.max if self.n else None,
+            "levels": [level.tolist() for level in self.levels],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, seed: Optional[int] = None) -> "KLLSketch":
+        sketch = cls(k=data["k"], seed=seed)
+        sketch.n = int(data["n"])
+        sketch.min = math.inf if data["min"] is None else float(data["min"])
+        sketch.max = -math.inf if data["max"] is None else float(data["max"])
+        sketch.levels = [np.asarray(level, dtype=float) for level in data["levels"]] or [np.empty(0)]
+        return sketch
+
+
+class FeatureSketches:
+    """One ``KLLSketch`` per column, updated from row batches."""
+
+    def __init__(self, columns: List[str], k: int = 200, seed: Optional[int] = 42):
+        self.columns = list(columns)
+        self.k = k
+        self.sketches = [
+            KLLSketch(k=k, seed=None if seed is None else seed + i)
+            for i in range(len(self.columns))
+        ]
+
+    def update(self, X) -> "FeatureSketches":
+        if hasattr(X, "columns"):
+            X = X[self.columns].to_numpy()
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X[:, None]
+        for j, sketch in enumerate(self.sketches):
+            sketch.update(X[:, j])
+        return self
+
+    def merge(self, other: "FeatureSketches") -> "FeatureSketches":
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge sketches over different columns")
+        for mine, theirs in zip(self.sketches, other.sketches):
+            mine.merge(theirs)
+        return self
+
+    @property
+    def n(self) -> int:
+        return self.sketches[0].n if self.sketches else 0
+
+    def quantile_edges(self, bins: int = 10) -> np.ndarray:
+        """Quantile bin edges per feature, shape (n_features, bins + 1)."""
+        qs = np.linspace(0.0, 1.0, bins + 1)
+        return np.vstack([sketch.quantile(qs) for sketch in self.sketches])
+
+    def bin_counts(self, edges: np.ndarray) -> np.ndarray:
+        """
+        Estimated counts per bin with the same semantics as
+        ``drift_monitor.bin_counts``: half-open bins, inclusive last edge,
+        values outside the edges dropped.
+        """
+        counts = []
+        for sketch, feature_edges in zip(self.sketches, edges):
+            below = sketch.rank(feature_edges)
+            below[-1] = sketch.rank(feature_edges[-1], inclusive=True)
+            counts.append(np.maximum(np.diff(below), 0.0))
+        return np.vstack(counts)
+
+    def to_dict(self) -> Dict:
+        return {
+            "columns": self.columns,
+            "k": self.k,
+            "sketches": [sketch.to_dict() for sketch in self.sketches],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "FeatureSketches":
+        sketches = cls(data["columns"], k=data["k"], seed=None)
+        sketches.sketches = [KLLSketch.from_dict(item) for item in data["sketches"]]
+        return sketches
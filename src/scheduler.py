@@ -0,0 +1,256 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.context import PipelineContext, resolve_context
+from src.stage_cache import StageCache
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    A unit of pipeline work. ``deps`` and ``outs`` are paths relative to the
+    repository root, declared the same way as in ``dvc/dvc.yaml``; a stage
+    depends on every selected stage that produces one of its ``deps``.
+    ``params`` are passed to ``func`` as keyword arguments. ``env`` marks a
+    stage whose results depend on the installed packages, so its cache key
+    covers them too.
+    """
+
+    name: str
+    func: Callable[..., Any]
+    deps: Tuple[str, ...] = ()
+    outs: Tuple[str, ...] = ()
+    params: Dict[str, Any] = field(default_factory=dict, hash=False, compare=False)
+    allow_failure: bool = False
+    cache: bool = False
+    env: bool = False
+
+
+@dataclass
+class ScheduleResult:
+    records: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    results: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, BaseException] = field(default_factory=dict)
+    critical_path: List[str] = field(default_factory=list)
+    critical_path_seconds: float = 0.0
+    wall_seconds: float = 0.0
+
+    @property
+    def failed(self) -> List[str]:
+        return [name for name, record in self.records.items() if record["status"] != "ok"]
+
+    def raise_for_failures(self) -> None:
+        if self.errors:
+            raise next(iter(self.errors.values()))
+
+    def summary(self) -> Dict[str, Any]:
+        busy = sum(record.get("duration_seconds", 0.0) for record in self.records.values())
+        return {
+            "status": "error" if self.errors else "ok",
+            "stages": self.records,
+            "duration_seconds": self.wall_seconds,
+            "stage_seconds_total": busy,
+            "critical_path": self.critical_path,
+            "critical_path_seconds": self.critical_path_seconds,
+        }
+
+
+def build_graph(stages: Sequence[Stage]) -> Dict[str, List[str]]:
+    producers = {}
+    for stage in stages:
+        for out in stage.outs:
+            if out in producers:
+                raise ValueError(f"{out} is produced by both {producers[out]} and {stage.name}")
+            producers[out] = stage.name
+    graph = {}
+    for stage in stages:
+        upstream = []
+        for dep in stage.deps:
+            producer = producers.get(dep)
+            if producer is not None and producer != stage.name and producer not in upstream:
+                upstream.append(producer)
+        graph[stage.name] = upstream
+    return graph
+
+
+def topological_order(stages: Sequence[Stage], graph: Dict[str, List[str]]) -> List[str]:
+    order = []
+    done = set()
+    remaining = [stage.name for stage in stages]
+    while remaining:
+        ready = [name for name in remaining if all(up in done for up in graph[name])]
+        if not ready:
+            raise ValueError(f"Dependency cycle between stages: {', '.join(remaining)}")
+        # Keep the declared order among stages that are ready at the same time.
+        name = ready[0]
+        order.append(name)
+        done.add(name)
+        remaining.remove(name)
+    return order
+
+
+def critical_path(
+    graph: Dict[str, List[str]],
+    durations: Dict[str, float],
+    order: Sequence[str],
+) -> Tuple[List[str], float]:
+    finish = {}
+    previous = {}
+    for name in order:
+        upstream = [up for up in graph[name] if up in finish]
+        best = max(upstream, key=lambda up: finish[up], default=None)
+        previous[name] = best
+        finish[name] = durations.get(name, 0.0) + (finish[best] if best else 0.0)
+    if not finish:
+        return [], 0.0
+    node = max(finish, key=finish.get)
+    total = finish[node]
+    path = []
+    while node is not None:
+        path.append(node)
+        node = previous[node]
+    return path[::-1], float(total)
+
+
+_worker_ctx: Optional[PipelineContext] = None
+
+
+def _init_worker(dtype: Optional[str], n_jobs: Optional[int] = None) -> None:
+    global _worker_ctx
+    _worker_ctx = PipelineContext(dtype=dtype, n_jobs=n_jobs)
+
+
+def _run_inline(
+    ctx: PipelineContext,
+    stage: Stage,
+    cache: Optional[StageCache] = None,
+) -> Tuple[Any, float, Optional[str]]:
+    started = time.perf_counter()
+    if cache is None:
+        result, cache_status = stage.func(ctx, **stage.params), None
+    else:
+        result, cache_status = cache.run(stage, ctx)
+    return result, time.perf_counter() - started, cache_status
+
+
+def _run_in_worker(stage: Stage, cache: Optional[StageCache] = None) -> Tuple[Any, float, Optional[str]]:
+    return _run_inline(_worker_ctx, stage, cache)
+
+
+def run_stages(
+    stages: Sequence[Stage],
+    ctx: PipelineContext = None,
+    max_workers: Optional[int] = 1,
+    executor: str = "process",
+    cache: Optional[StageCache] = None,
+) -> ScheduleResult:
+    """
+    Run ``stages`` respecting their declared dependencies. With one worker the
+    stages run inline against ``ctx``; otherwise independent stages run
+    concurrently and each worker process keeps its own context. The cores
+    available to ``ctx`` are split between the workers, so stages that start
+    pools of their own run them inline once the budget is one. Stages marked
+    ``cache`` are looked up in ``cache`` first when one is given.
+    """
+    ctx = resolve_context(ctx)
+    by_name = {stage.name: stage for stage in stages}
+    graph = build_graph(stages)
+    order = topological_order(stages, graph)
+    available = ctx.worker_budget()
+    if max_workers is None:
+        max_workers = min(len(stages), available)
+    max_workers = max(1, max_workers)
+    stage_budget = max(1, available // max_workers)
+
+    run = ScheduleResult()
+    durations = {}
+    started = time.perf_counter()
+
+    def finish(
+        name: str,
+        result: Any = None,
+        duration: float = 0.0,
+        cache_status: Optional[str] = None,
+        error: BaseException = None,
+    ) -> None:
+        offset = time.perf_counter() - started
+        record = {
+            "status": "ok",
+            "duration_seconds": duration,
+            "finished_at_seconds": offset,
+            "upstream": graph[name],
+        }
+        if cache_status is not None:
+            record["cache"] = cache_status
+            cache.record(cache_status)
+        if error is not None:
+            record["status"] = "error"
+            record["detail"] = str(error)
+            if not by_name[name].allow_failure:
+                run.errors[name] = error
+        else:
+            run.results[name] = result
+        durations[name] = duration
+        run.records[name] = record
+
+    def blocked(name: str) -> bool:
+        return any(up in run.errors or run.records.get(up, {}).get("status") == "skipped" for up in graph[name])
+
+    if max_workers == 1:
+        for name in order:
+            if blocked(name):
+                run.records[name] = {"status": "skipped", "upstream": graph[name]}
+                continue
+            stage_started = time.perf_counter()
+            try:
+                finish(name, *_run_inline(ctx, by_name[name], cache))
+            except Exception as e:
+                finish(name, error=e, duration=time.perf_counter() - stage_started)
+    else:
+        if executor == "process":
+            pool = ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(ctx.dtype, stage_budget))
+        elif executor == "thread":
+            pool = ThreadPoolExecutor(max_workers)
+        else:
+            raise ValueError(f"Unknown executor: {executor}")
+
+        def submit(stage: Stage):
+            if executor == "process":
+                return pool.submit(_run_in_worker, stage, cache)
+            return pool.submit(_run_inline, ctx, stage, cache)
+
+        pending = list(order)
+        running = {}
+        submitted_at = {}
+        # Thread workers share ``ctx``, so it carries the per-stage budget while they run.
+        ctx_budget = ctx.n_jobs
+        if executor == "thread":
+            ctx.n_jobs = stage_budget
+        try:
+            with pool:
+                while pending or running:
+                    for name in list(pending):
+                        if blocked(name):
+                            run.records[name] = {"status": "skipped", "upstream": graph[name]}
+                            pending.remove(name)
+                        elif all(up in run.records for up in graph[name]):
+                            running[submit(by_name[name])] = name
+                            submitted_at[name] = time.perf_counter()
+                            pending.remove(name)
+                    if not running:
+                        continue
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        try:
+                            finish(name, *future.result())
+                        except Exception as e:
+                            finish(name, error=e, duration=time.perf_counter() - submitted_at[name])
+        finally:
+            ctx.n_jobs = ctx_budget
+
+    run.wall_seconds = time.perf_counter() - started
+    run.critical_path, run.critical_path_seconds = critical_path(graph, durations, order)
+    return run
@@ -0,0 +1,286 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+from prometheus_client import Counter, Histogram, make_asgi_app
+from scipy.special import expit
+
+from src.attack_engine import is_linear_binary
+from src.linear_scorer import LinearScorer
+from src.model_manager import DEFAULT_POLL_INTERVAL, ModelManager, SignatureError
+from src.model_registry import DEFAULT_MAX_MODELS, ModelRegistry
+from src.utils import MODELS_DIR, ROOT, load_model
+
+
+MODEL_PATH = Path(os.getenv("MLSECOPS_MODEL_PATH", str(MODELS_DIR / "model.pkl")))
+PUBLIC_KEY_PATH = Path(os.getenv("MLSECOPS_MODEL_PUBLIC_KEY", str(ROOT / "security/keys/private_key.pub.pem")))
+SIGNATURE_PATH = Path(os.getenv("MLSECOPS_MODEL_SIGNATURE", str(ROOT / "security/signatures/model.sig")))
+POLL_INTERVAL = float(os.getenv("MLSECOPS_MODEL_POLL_INTERVAL", str(DEFAULT_POLL_INTERVAL)))
+REGISTRY_MAX_MODELS = int(os.getenv("MLSECOPS_REGISTRY_MAX_MODELS", str(DEFAULT_MAX_MODELS)))
+REGISTRY_MAX_BYTES = os.getenv("MLSECOPS_REGISTRY_MAX_BYTES")
+MAX_BATCH_SIZE = int(os.getenv("MLSECOPS_MAX_BATCH_SIZE", "256"))
+MAX_WAIT_MS = float(os.getenv("MLSECOPS_MAX_WAIT_MS", "2.0"))
+
+REQUEST_COUNT = Counter("scoring_request_total", "Total scoring requests", ["status"])
+REQUEST_LATENCY = Histogram("scoring_request_latency_seconds", "Scoring request latency")
+BATCH_SIZE = Histogram(
+    "scoring_batch_size",
+    "Rows scored per model call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096),
+)
+QUEUE_DELAY = Histogram(
+    "scoring_queue_delay_seconds",
+    "Time a request waits before its batch is scored",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+
+def load_serving_model(f):
+    model = load_model(f)
+    # Derived from the verified pickle; linear_scorer.npz is not covered by the signature.
+    return LinearScorer.from_model(model) if is_linear_binary(model) else model
+
+
+class RegisteredModel:
+    """
+    Model source for a MicroBatcher serving one model of the registry. Each
+    read of ``model`` is one registry lookup and may load the model, so it
+    only happens in the scoring thread; ``n_features`` is remembered from
+    the last load for validating requests on the event loop.
+    """
+
+    def __init__(self, registry: ModelRegistry, model_ref: str):
+        self.registry = registry
+        self.model_ref = model_ref
+        self.n_features: Optional[int] = None
+
+    @property
+    def model(self):
+        model = self.registry.get(self.model_ref)
+        self.n_features = getattr(model, "n_features_in_", None)
+        return model
+
+
+class MicroBatcher:
+    """
+    Collects rows from concurrent requests into batches for one vectorized
+    ``predict_proba`` call. A batch is dispatched once it holds
+    ``max_batch_size`` rows or its oldest request has waited ``max_wait_ms``;
+    a single request larger than the limit is scored as its own batch.
+    Scoring runs in a worker thread so the next batch fills meanwhile. Each
+    batch is scored by the model ``manager`` serves when it is dispatched.
+    """
+
+    def __init__(self, manager: ModelManager, max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS):
+        self.manager = manager
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending = None
+
+    def start(self) -> None:
+        self.queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def n_features(self) -> Optional[int]:
+        if isinstance(self.manager, RegisteredModel):
+            return self.manager.n_features
+        return getattr(self.manager.model, "n_features_in_", None)
+
+    def score(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Class-1 probabilities and predicted labels, decided as the model's own ``predict`` does."""
+        model = self.manager.model
+        if isinstance(model, LinearScorer):
+            decision = model.decision_function(X)
+            return expit(decision), model.classes_[(decision > 0).astype(int)]
+        columns = getattr(model, "feature_names_in_", None)
+        proba = model.predict_proba(pd.DataFrame(X, columns=columns))
+        return proba[:, 1], model.classes_[np.argmax(proba, axis=1)]
+
+    async def submit(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((rows, future, time.perf_counter()))
+        return await future
+
+    async def _next_batch(self) -> list:
+        item = self._pending or await self.queue.get()
+        self._pending = None
+        batch, n_rows = [item], len(item[0])
+        deadline = item[2] + self.max_wait
+        while n_rows < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                if timeout > 0:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                else:
+                    item = self.queue.get_nowait()
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+            if n_rows + len(item[0]) > self.max_batch_size:
+                self._pending = item
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        return batch
+
+    async def _score_batch(self, batch: list) -> None:
+        try:
+            X = np.concatenate([rows for rows, _, _ in batch])
+        except ValueError:
+            # Mismatched row widths: score each request alone so only the bad ones fail.
+            for item in batch:
+                await self._score_batch([item])
+            return
+        BATCH_SIZE.observe(len(X))
+        try:
+            proba, predictions = await asyncio.get_running_loop().run_in_executor(None, self.score, X)
+        except Exception as exc:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        start = 0
+        for rows, future, _ in batch:
+            end = start + len(rows)
+            if not future.done():
+                future.set_result((proba[start:end], predictions[start:end]))
+            start = end
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            dispatched = time.perf_counter()
+            for _, _, enqueued in batch:
+                QUEUE_DELAY.observe(dispatched - enqueued)
+            try:
+                await self._score_batch(batch)
+            except Exception as exc:
+                # Never let one batch stop the loop serving later requests.
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+
+
+app = FastAPI(title="MLSecOps Scoring Service")
+app.mount("/metrics", make_asgi_app())
+
+
+class PredictRequest(BaseModel):
+    instances: List[List[float]]
+    # MLflow model or run ID of a logged variant; the deployed model.pkl when omitted.
+    model: Optional[str] = None
+
+
+class PredictResponse(BaseModel):
+    probabilities: List[float]
+    # Labels from the model's classes_.
+    predictions: List[Union[int, float, str]]
+
+
+@app.on_event("startup")
+async def startup_event():
+    # Signatures are enforced whenever a public key is deployed.
+    verify = PUBLIC_KEY_PATH.exists()
+    app.state.manager = ModelManager(
+        MODEL_PATH,
+        public_key_path=PUBLIC_KEY_PATH if verify else None,
+        signature_path=SIGNATURE_PATH if verify else None,
+        loader=load_serving_model,
+        poll_interval=POLL_INTERVAL,
+    ).start()
+    app.state.batcher = MicroBatcher(app.state.manager)
+    app.state.batcher.start()
+    app.state.registry = ModelRegistry(
+        max_models=REGISTRY_MAX_MODELS,
+        max_bytes=None if REGISTRY_MAX_BYTES is None else int(REGISTRY_MAX_BYTES),
+        loader=load_serving_model,
+        # Logged variants must carry a model.sig that verifies, like model.pkl.
+        public_key_path=PUBLIC_KEY_PATH if verify else None,
+    )
+    app.state.variant_batchers = {}
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await app.state.batcher.stop()
+    for batcher in app.state.variant_batchers.values():
+        await batcher.stop()
+    app.state.manager.stop()
+
+
+@app.get("/model")
+async def model_status():
+    return app.state.manager.status()
+
+
+@app.get("/registry")
+async def registry_status():
+    return app.state.registry.stats()
+
+
+async def _variant_batcher(model_ref: str) -> MicroBatcher:
+    batchers = app.state.variant_batchers
+    if model_ref in batchers:
+        return batchers[model_ref]
+    # Resolving globs mlruns/ and loading unpickles; keep both off the event loop.
+    loop = asyncio.get_running_loop()
+    source = RegisteredModel(app.state.registry, model_ref)
+    try:
+        await loop.run_in_executor(None, app.state.registry.resolve, model_ref)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    try:
+        await loop.run_in_executor(None, lambda: source.model)
+    except SignatureError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    if model_ref not in batchers:
+        batcher = MicroBatcher(source)
+        batcher.start()
+        batchers[model_ref] = batcher
+    return batchers[model_ref]
+
+
+@app.post("/predict", response_model=PredictResponse)
+async def predict(request: PredictRequest):
+    start_time = time.perf_counter()
+    if request.model is None:
+        batcher: MicroBatcher = app.state.batcher
+    else:
+        batcher = await _variant_batcher(request.model)
+    try:
+        rows = np.asarray(request.instances, dtype=float)
+    except ValueError:
+        rows = np.empty(0)
+    if rows.ndim != 2 or len(rows) == 0 or (batcher.n_features and rows.shape[1] != batcher.n_features):
+        REQUEST_COUNT.labels(status="invalid").inc()
+        raise HTTPException(status_code=422, detail=f"Expected rows of {batcher.n_features} features")
+    try:
+        proba, predictions = await batcher.submit(rows)
+    except Exception as e:
+        REQUEST_COUNT.labels(status="error").inc()
+        raise HTTPException(status_code=500, detail=str(e))
+    REQUEST_COUNT.labels(status="success").inc()
+    REQUEST_LATENCY.observe(time.perf_counter() - start_time)
+    return PredictResponse(probabilities=proba.tolist(), predictions=predictions.tolist())
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("MLSECOPS_SCORING_PORT", "8001")))
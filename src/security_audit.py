@@ -1,3 +1,8 @@
+import argparse
+from typing import Optional
+
+from src.context import PipelineContext, resolve_context
+from src.scheduler import Stage, run_stages
 from src.utils import REPORTS_DIR, ensure_dir, save_json
 from security import (
     owasp_ml_top10,
@@ -9,14 +14,87 @@ from security import (
 )
 
 
-def run_audit() -> dict:
-    results = {}
-    results["owasp_ml_top10"] = owasp_ml_top10.run()
-    results["owasp_llm_top10"] = owasp_llm_top10.run()
-    results["mitre_atlas"] = mitre_atlas.run()
-    results["supply_chain"] = supply_chain.validate_supply_chain()
-    results["sbom"] = sbom.build_sbom()
-    results["sbom_cyclonedx"] = cyclonedx_generator.generate_cyclonedx()
+def _owasp_llm_top10(ctx: PipelineContext) -> dict:
+    return owasp_llm_top10.run()
+
+
+def _supply_chain(ctx: PipelineContext) -> dict:
+    return supply_chain.validate_supply_chain()
+
+
+def _sbom(ctx: PipelineContext) -> dict:
+    return sbom.build_sbom()
+
+
+def _sbom_cyclonedx(ctx: PipelineContext) -> dict:
+    return cyclonedx_generator.generate_cyclonedx()
+
+
+AUDIT_CHECKS = (
+    Stage(
+        "owasp_ml_top10",
+        owasp_ml_top10.run,
+        deps=(
+            "reports/adversarial_metrics.json",
+            "reports/poisoning_risk.json",
+            "reports/drift_metrics.json",
+            "reports/concept_drift.json",
+            "reports/membership_inference.json",
+            "reports/leakage.json",
+            "reports/supply_chain.json",
+            "reports/baseline_predictions.json",
+            "reports/model_signing.json",
+        ),
+        outs=("reports/owasp_ml_top10.json",),
+    ),
+    Stage("owasp_llm_top10", _owasp_llm_top10, outs=("reports/owasp_llm_top10.json",)),
+    Stage(
+        "mitre_atlas",
+        mitre_atlas.run,
+        deps=(
+            "reports/adversarial_metrics.json",
+            "reports/poisoning_risk.json",
+            "reports/sbom.json",
+        ),
+        outs=("reports/mitre_atlas.json",),
+    ),
+    Stage("supply_chain", _supply_chain),
+    Stage("sbom", _sbom),
+    Stage(
+        "sbom_cyclonedx",
+        _sbom_cyclonedx,
+        deps=("requirements.txt",),
+        outs=("reports/sbom_cyclonedx.json", "reports/sbom_cyclonedx_status.json"),
+    ),
+)
+
+AUDIT_SOURCES = (
+    "src/security_audit.py",
+    "security/owasp_ml_top10.py",
+    "security/owasp_llm_top10.py",
+    "security/mitre_atlas.py",
+    "security/supply_chain.py",
+    "security/sbom.py",
+    "security/cyclonedx_generator.py",
+)
+AUDIT_INPUTS = tuple(sorted({dep for check in AUDIT_CHECKS for dep in check.deps}))
+AUDIT_OUTPUTS = tuple(out for check in AUDIT_CHECKS for out in check.outs) + (
+    "reports/security_audit.json",
+)
+
+
+def run_audit(ctx: PipelineContext = None, max_workers: Optional[int] = None) -> dict:
+    """
+    Run every audit check. Standalone, the checks run in a process pool;
+    given a pipeline context they share it, inline by default or in threads
+    when ``max_workers`` asks for more than one.
+    """
+    if ctx is None:
+        run = run_stages(AUDIT_CHECKS, resolve_context(), max_workers=max_workers)
+    else:
+        run = run_stages(AUDIT_CHECKS, ctx, max_workers=max_workers or 1, executor="thread")
+    run.raise_for_failures()
+    results = {check.name: run.results[check.name] for check in AUDIT_CHECKS}
     path = REPORTS_DIR / "security_audit.json"
     ensure_dir(path.parent)
     save_json(path, results)
@@ -24,7 +102,15 @@ def run_audit() -> dict:
 
 
 def main() -> None:
-    run_audit()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Checks to run concurrently; defaults to one per check up to the CPU count.",
+    )
+    args = parser.parse_args()
+    run_audit(max_workers=args.workers)
 
 
 if __name__ == "__main__":
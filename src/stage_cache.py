@@ -0,0 +1,178 @@
+import importlib.metadata
+import inspect
+import json
+import os
+import shutil
+import time
+import uuid
+from functools import lru_cache
+from hashlib import sha256
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import mlflow
+
+from src.context import PipelineContext
+from src.utils import CACHE_DIR, ROOT, ensure_dir, hash_file, load_json, save_json
+
+
+STAGE_CACHE_DIR = CACHE_DIR / "stages"
+
+
+def _copy_atomic(src: Path, dst: Path) -> None:
+    ensure_dir(dst.parent)
+    tmp = dst.with_name(f".{dst.name}.{uuid.uuid4().hex}.tmp")
+    shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def _list_artifacts(client, run_id: str, path: Optional[str] = None) -> list:
+    found = []
+    for info in client.list_artifacts(run_id, path):
+        if info.is_dir:
+            found.extend(_list_artifacts(client, run_id, info.path))
+        else:
+            found.append(info.path)
+    return found
+
+
+@lru_cache(maxsize=1)
+def environment_digest() -> str:
+    """Digest of the name and version of every installed distribution."""
+    installed = sorted(
+        {(str(dist.metadata["Name"]).lower(), dist.version) for dist in importlib.metadata.distributions()}
+    )
+    return sha256("\n".join(f"{name}=={version}" for name, version in installed).encode("utf-8")).hexdigest()
+
+
+class StageCache:
+    """
+    Content-addressed cache of stage results. The key covers the content of
+    every declared dependency, the stage's source module and its parameters,
+    plus the installed distributions for stages marked ``env``;
+    a hit restores the declared outputs and replays the MLflow run.
+    """
+
+    def __init__(self, root: Path = None, enabled: bool = True):
+        self.root = Path(root) if root is not None else STAGE_CACHE_DIR
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, status: Optional[str]) -> None:
+        if status == "hit":
+            self.hits += 1
+        elif status == "miss":
+            self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": float(self.hits / total) if total else 0.0,
+        }
+
+    def fingerprint(self, stage, ctx: PipelineContext) -> str:
+        h = sha256()
+        h.update(stage.name.encode("utf-8"))
+        for dep in sorted(set(stage.deps)):
+            path = ROOT / dep
+            digest = hash_file(path) if path.is_file() else "missing"
+            h.update(f"{dep}={digest}".encode("utf-8"))
+        source = inspect.getsourcefile(stage.func)
+        if source is not None:
+            h.update(hash_file(Path(source)).encode("utf-8"))
+        if stage.env:
+            h.update(environment_digest().encode("utf-8"))
+        params = {"dtype": ctx.dtype, **stage.params}
+        h.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+        return h.hexdigest()
+
+    def _entry_dir(self, stage, key: str) -> Path:
+        return self.root / stage.name / key
+
+    def load(self, stage, key: str) -> Optional[Dict[str, Any]]:
+        entry_path = self._entry_dir(stage, key) / "entry.json"
+        if not entry_path.exists():
+            return None
+        return load_json(entry_path)
+
+    def restore(self, stage, key: str, entry: Dict[str, Any], ctx: PipelineContext) -> Any:
+        entry_dir = self._entry_dir(stage, key)
+        for out in entry["outs"]:
+            _copy_atomic(entry_dir / "outs" / out, ROOT / out)
+        run = entry.get("mlflow_run")
+        if run is not None:
+            ctx.configure_mlflow()
+            with mlflow.start_run(run_name=run["run_name"]):
+                if run["metrics"]:
+                    mlflow.log_metrics(run["metrics"])
+                if run["params"]:
+                    mlflow.log_params(run["params"])
+                mlflow.set_tags({"stage_cache": "hit", "stage_cache_key": key})
+                for artifact in run["artifacts"]:
+                    mlflow.log_artifact(str(ROOT / artifact["path"]), artifact_path=artifact["artifact_path"])
+        return entry["result"]
+
+    def _capture_run(self, stage, run_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        if run_id is None:
+            return None
+        client = mlflow.tracking.MlflowClient()
+        run = client.get_run(run_id)
+        outs_by_name = {Path(out).name: out for out in stage.outs}
+        artifacts = []
+        for artifact in _list_artifacts(client, run.info.run_id):
+            out = outs_by_name.get(Path(artifact).name)
+            if out is not None:
+                artifact_path = str(Path(artifact).parent)
+                artifacts.append(
+                    {"path": out, "artifact_path": None if artifact_path == "." else artifact_path}
+                )
+        return {
+            "run_name": run.info.run_name,
+            "metrics": dict(run.data.metrics),
+            "params": dict(run.data.params),
+            "artifacts": artifacts,
+        }
+
+    def store(self, stage, key: str, result: Any, run_id: Optional[str] = None) -> None:
+        entry_dir = self._entry_dir(stage, key)
+        if entry_dir.exists():
+            return
+        tmp_dir = entry_dir.with_name(f".{key}.{uuid.uuid4().hex}.tmp")
+        outs = []
+        for out in stage.outs:
+            path = ROOT / out
+            if path.is_file():
+                _copy_atomic(path, tmp_dir / "outs" / out)
+                outs.append(out)
+        entry = {
+            "stage": stage.name,
+            "key": key,
+            "created_at": time.time(),
+            "outs": outs,
+            "result": json.loads(json.dumps(result, default=str)),
+            "mlflow_run": self._capture_run(stage, run_id),
+        }
+        save_json(tmp_dir / "entry.json", entry)
+        try:
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            # Another worker stored the same key first.
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def run(self, stage, ctx: PipelineContext) -> Tuple[Any, Optional[str]]:
+        if not self.enabled or not stage.cache:
+            return stage.func(ctx, **stage.params), None
+        key = self.fingerprint(stage, ctx)
+        entry = self.load(stage, key)
+        if entry is not None:
+            return self.restore(stage, key, entry, ctx), "hit"
+        # Only the run this stage started in this thread is replayed on a hit.
+        ctx.pop_runs()
+        result = stage.func(ctx, **stage.params)
+        runs = ctx.pop_runs()
+        self.store(stage, key, result, runs[-1] if runs else None)
+        return result, "miss"
@@ -4,23 +4,43 @@ import mlflow
 import mlflow.sklearn
 from sklearn.linear_model import LogisticRegression
 
+from src.context import PipelineContext, resolve_context
+from src.attack_engine import is_linear_binary
+from src.drift_monitor import (
+    build_feature_sketches,
+    build_reference_profile,
+    save_reference_profile,
+    save_reference_sketches,
+)
+from src.linear_scorer import export_linear_scorer
 from src.utils import (
-    load_train_test_data,
-    configure_mlflow,
     save_model,
     MODELS_DIR,
 )
 
 
-def train() -> Path:
-    X_train, X_test, y_train, y_test = load_train_test_data()
-    configure_mlflow()
+def train(ctx: PipelineContext = None) -> Path:
+    ctx = resolve_context(ctx)
+    X_train, X_test, y_train, y_test = ctx.data
+    ctx.configure_mlflow()
     mlflow.sklearn.autolog()
-    with mlflow.start_run(run_name="train_model"):
+    with ctx.start_run(run_name="train_model"):
         model = LogisticRegression(max_iter=1000, solver="liblinear")
         model.fit(X_train, y_train)
+        # Autolog tags the estimator with its run ID; keep model.pkl identical across runs.
+        vars(model).pop("_mlflow_run_id", None)
         model_path = save_model(model)
+        ctx.set_model(model, model_path)
+        if is_linear_binary(model):
+            scorer_path = export_linear_scorer(model, X_train, model_path)
+            mlflow.log_artifact(str(scorer_path), artifact_path="model")
+        profile_path = save_reference_profile(build_reference_profile(X_train))
+        sketch_path = save_reference_sketches(build_feature_sketches((X_train, y_train)))
         mlflow.sklearn.log_model(model, artifact_path="model")
+        mlflow.log_artifact(str(profile_path), artifact_path="drift_reference")
+        mlflow.log_artifact(str(sketch_path), artifact_path="drift_reference")
+    # Later stages may run in the same interpreter; keep their fits out of autolog.
+    mlflow.sklearn.autolog(disable=True)
     return model_path
 
 
@@ -2,7 +2,7 @@ import json
 import os
 import hashlib
 from pathlib import Path
-from typing import Tuple
+from typing import Iterator, List, Optional, Tuple
 
 import joblib
 import numpy as np
@@ -18,6 +18,11 @@ DATA_DIR = DVC_DIR / "data"
 MODELS_DIR = DVC_DIR / "models"
 REPORTS_DIR = ROOT / "reports"
 LOGS_DIR = ROOT / "logs"
+CACHE_DIR = ROOT / ".cache"
+DATASET_CACHE_DIR = CACHE_DIR / "datasets"
+TARGET_COL = "label"
+DEFAULT_CHUNK_SIZE = int(os.getenv("MLSECOPS_CHUNK_SIZE", "65536"))
+DATA_DTYPES = {"float32": np.float32, "float64": np.float64}
 
 
 def ensure_dir(path: Path) -> Path:
@@ -50,7 +55,199 @@ def get_data() -> Tuple[pd.DataFrame, str]:
     return df, "label"
 
 
-def prepare_train_test(test_size: float = 0.2, random_state: int = 42):
+def resolve_dtype(dtype=None) -> np.dtype:
+    if dtype is None:
+        dtype = os.getenv("MLSECOPS_DATA_DTYPE", "float64")
+    if isinstance(dtype, str):
+        if dtype not in DATA_DTYPES:
+            raise ValueError(f"Unsupported data dtype: {dtype}")
+        dtype = DATA_DTYPES[dtype]
+    dtype = np.dtype(dtype)
+    if dtype.name not in DATA_DTYPES:
+        raise ValueError(f"Unsupported data dtype: {dtype}")
+    return dtype
+
+
+def dataset_hash(train_path: Path = None, test_path: Path = None) -> str:
+    if train_path is None:
+        train_path = DATA_DIR / "train.csv"
+    if test_path is None:
+        test_path = DATA_DIR / "test.csv"
+    h = hashlib.sha256()
+    h.update(hash_file(train_path).encode("utf-8"))
+    h.update(hash_file(test_path).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _atomic_save_npy(path: Path, array: np.ndarray) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def write_dataset_cache(X_train, X_test, y_train, y_test, key: str, dtype=None) -> Path:
+    dtype = resolve_dtype(dtype)
+    cache_dir = ensure_dir(DATASET_CACHE_DIR / key)
+    for split, X, y in (("train", X_train, y_train), ("test", X_test, y_test)):
+        _atomic_save_npy(
+            cache_dir / f"{split}_X.{dtype.name}.npy",
+            np.ascontiguousarray(X.to_numpy(dtype=dtype)),
+        )
+        _atomic_save_npy(cache_dir / f"{split}_y.npy", np.asarray(y, dtype=np.int64))
+    # The column manifest is written last and marks the cache entry as complete.
+    save_json(
+        cache_dir / f"columns.{dtype.name}.json",
+        {"columns": list(X_train.columns), "target": y_train.name or TARGET_COL},
+    )
+    return cache_dir
+
+
+def read_dataset_cache(key: str, dtype=None):
+    dtype = resolve_dtype(dtype)
+    cache_dir = DATASET_CACHE_DIR / key
+    manifest_path = cache_dir / f"columns.{dtype.name}.json"
+    if not manifest_path.exists():
+        return None
+    manifest = load_json(manifest_path)
+    frames = []
+    for split in ("train", "test"):
+        X = np.load(cache_dir / f"{split}_X.{dtype.name}.npy", mmap_mode="r")
+        y = np.load(cache_dir / f"{split}_y.npy", mmap_mode="r")
+        frames.append(pd.DataFrame(X, columns=manifest["columns"], copy=False))
+        frames.append(pd.Series(y, name=manifest["target"], copy=False))
+    X_train, y_train, X_test, y_test = frames
+    return X_train, X_test, y_train, y_test
+
+
+class _SplitWriter:
+    """Appends (X, y) chunks to a split CSV and to raw binary buffers."""
+
+    def __init__(self, split: str, dtype: np.dtype, csv_path: Optional[Path] = None):
+        self.split = split
+        self.dtype = dtype
+        self.csv_path = csv_path
+        ensure_dir(DATASET_CACHE_DIR)
+        self.raw_X_path = DATASET_CACHE_DIR / f".{split}_X.{os.getpid()}.raw"
+        self.raw_y_path = DATASET_CACHE_DIR / f".{split}_y.{os.getpid()}.raw"
+        self._raw_X = self.raw_X_path.open("wb")
+        self._raw_y = self.raw_y_path.open("wb")
+        self.columns: Optional[List[str]] = None
+        self.target: str = TARGET_COL
+        self.rows = 0
+
+    def write(self, X: pd.DataFrame, y: pd.Series) -> None:
+        if self.columns is None:
+            self.columns = list(X.columns)
+            self.target = y.name or TARGET_COL
+            if self.csv_path is not None:
+                pd.concat([X, y], axis=1).iloc[:0].to_csv(self.csv_path, index=False)
+        if self.csv_path is not None:
+            pd.concat([X, y], axis=1).to_csv(self.csv_path, mode="a", header=False, index=False)
+        self._raw_X.write(np.ascontiguousarray(X.to_numpy(dtype=self.dtype)).tobytes())
+        self._raw_y.write(np.asarray(y, dtype=np.int64).tobytes())
+        self.rows += len(X)
+
+    def _finalize_array(self, raw_path: Path, path: Path, dtype, shape) -> None:
+        tmp_path = path.with_name(path.name + ".tmp")
+        out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=shape)
+        if shape[0]:
+            src = np.memmap(raw_path, dtype=dtype, mode="r", shape=shape)
+            for start in range(0, shape[0], DEFAULT_CHUNK_SIZE):
+                out[start:start + DEFAULT_CHUNK_SIZE] = src[start:start + DEFAULT_CHUNK_SIZE]
+            del src
+        out.flush()
+        del out
+        os.replace(tmp_path, path)
+        raw_path.unlink()
+
+    def finalize(self, cache_dir: Path) -> None:
+        self._raw_X.close()
+        self._raw_y.close()
+        n_features = len(self.columns or [])
+        self._finalize_array(
+            self.raw_X_path,
+            cache_dir / f"{self.split}_X.{self.dtype.name}.npy",
+            self.dtype,
+            (self.rows, n_features),
+        )
+        self._finalize_array(
+            self.raw_y_path, cache_dir / f"{self.split}_y.npy", np.int64, (self.rows,)
+        )
+
+
+def _finalize_dataset_cache(train: _SplitWriter, test: _SplitWriter, key: str) -> Path:
+    cache_dir = ensure_dir(DATASET_CACHE_DIR / key)
+    train.finalize(cache_dir)
+    test.finalize(cache_dir)
+    save_json(
+        cache_dir / f"columns.{train.dtype.name}.json",
+        {"columns": train.columns or [], "target": train.target},
+    )
+    return cache_dir
+
+
+def _csv_to_dataset_cache(train_path: Path, test_path: Path, key: str, dtype, chunk_size: int) -> Path:
+    writers = []
+    for split, path in (("train", train_path), ("test", test_path)):
+        writer = _SplitWriter(split, dtype)
+        for chunk in pd.read_csv(path, chunksize=chunk_size):
+            writer.write(chunk.drop(columns=[TARGET_COL]), chunk[TARGET_COL])
+        writers.append(writer)
+    return _finalize_dataset_cache(writers[0], writers[1], key)
+
+
+def _prepare_train_test_out_of_core(
+    source: Path,
+    target_col: str,
+    test_size: float,
+    random_state: int,
+    dtype: np.dtype,
+    chunk_size: int,
+):
+    ensure_dir(DATA_DIR)
+    rng = np.random.default_rng(random_state)
+    train = _SplitWriter("train", dtype, DATA_DIR / "train.csv")
+    test = _SplitWriter("test", dtype, DATA_DIR / "test.csv")
+    for chunk in pd.read_csv(source, chunksize=chunk_size):
+        X = chunk.drop(columns=[target_col])
+        y = chunk[target_col].rename(TARGET_COL)
+        # Stratify within each chunk: every label contributes test_size of its rows.
+        is_test = np.zeros(len(chunk), dtype=bool)
+        labels = y.to_numpy()
+        for label in np.unique(labels):
+            idx = np.flatnonzero(labels == label)
+            n_test = int(round(test_size * idx.size))
+            is_test[rng.choice(idx, size=n_test, replace=False)] = True
+        train.write(X[~is_test], y[~is_test])
+        test.write(X[is_test], y[is_test])
+    key = dataset_hash()
+    _finalize_dataset_cache(train, test, key)
+    return read_dataset_cache(key, dtype=dtype)
+
+
+def prepare_train_test(
+    test_size: float = 0.2,
+    random_state: int = 42,
+    dtype=None,
+    source: Path = None,
+    target_col: str = TARGET_COL,
+    chunk_size: int = None,
+):
+    """
+    Split the dataset into ``dvc/data/{train,test}.csv`` and the binary cache.
+    With ``source`` (a CSV containing ``target_col``) the split is streamed in
+    chunks and the returned frames are backed by the memory-mapped cache.
+    """
+    if source is not None:
+        return _prepare_train_test_out_of_core(
+            Path(source),
+            target_col,
+            test_size,
+            random_state,
+            resolve_dtype(dtype),
+            chunk_size or DEFAULT_CHUNK_SIZE,
+        )
     df, target_col = get_data()
     X = df.drop(columns=[target_col])
     y = df[target_col]
@@ -62,22 +259,123 @@ def prepare_train_test(test_size: float = 0.2, random_state: int = 42):
     test_df = pd.concat([X_test, y_test], axis=1)
     train_df.to_csv(DATA_DIR / "train.csv", index=False)
     test_df.to_csv(DATA_DIR / "test.csv", index=False)
+    write_dataset_cache(X_train, X_test, y_train, y_test, dataset_hash(), dtype=dtype)
     return X_train, X_test, y_train, y_test
 
 
-def load_train_test_data():
+def load_train_test_data(dtype=None):
     train_path = DATA_DIR / "train.csv"
     test_path = DATA_DIR / "test.csv"
     if not train_path.exists() or not test_path.exists():
-        return prepare_train_test()
-    train_df = pd.read_csv(train_path)
-    test_df = pd.read_csv(test_path)
-    target_col = "label"
-    X_train = train_df.drop(columns=[target_col])
-    y_train = train_df[target_col]
-    X_test = test_df.drop(columns=[target_col])
-    y_test = test_df[target_col]
-    return X_train, X_test, y_train, y_test
+        return prepare_train_test(dtype=dtype)
+    key = dataset_hash(train_path, test_path)
+    cached = read_dataset_cache(key, dtype=dtype)
+    if cached is not None:
+        return cached
+    # Convert chunk by chunk so the CSVs are never fully materialized.
+    _csv_to_dataset_cache(train_path, test_path, key, resolve_dtype(dtype), DEFAULT_CHUNK_SIZE)
+    return read_dataset_cache(key, dtype=dtype)
+
+
+def iter_frame_chunks(X: pd.DataFrame, y: pd.Series, chunk_size: int = None) -> Iterator[Tuple[pd.DataFrame, pd.Series]]:
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    for start in range(0, len(X), chunk_size):
+        yield X.iloc[start:start + chunk_size], y.iloc[start:start + chunk_size]
+
+
+def iter_data_chunks(
+    split: str = "train",
+    chunk_size: int = None,
+    dtype=None,
+) -> Iterator[Tuple[pd.DataFrame, pd.Series]]:
+    """
+    Yield bounded (X, y) chunks of a stored split. Served as slices of the
+    memory-mapped cache when it is current, otherwise parsed from the CSV.
+    """
+    if split not in ("train", "test"):
+        raise ValueError(f"Unknown split: {split}")
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    train_path = DATA_DIR / "train.csv"
+    test_path = DATA_DIR / "test.csv"
+    if not train_path.exists() or not test_path.exists():
+        prepare_train_test(dtype=dtype)
+    cached = read_dataset_cache(dataset_hash(train_path, test_path), dtype=dtype)
+    if cached is not None:
+        X_train, X_test, y_train, y_test = cached
+        if split == "train":
+            yield from iter_frame_chunks(X_train, y_train, chunk_size)
+        else:
+            yield from iter_frame_chunks(X_test, y_test, chunk_size)
+        return
+    dtype = resolve_dtype(dtype)
+    path = train_path if split == "train" else test_path
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        yield chunk.drop(columns=[TARGET_COL]).astype(dtype), chunk[TARGET_COL]
+
+
+class DataChunks:
+    """
+    Re-iterable stream of (X, y) chunks over a stored split name or an
+    in-memory (X, y) pair, so stages can make more than one pass.
+    """
+
+    def __init__(self, source, chunk_size: int = None, dtype=None):
+        self.source = source
+        self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        self.dtype = dtype
+
+    def __iter__(self) -> Iterator[Tuple[pd.DataFrame, pd.Series]]:
+        if isinstance(self.source, str):
+            return iter_data_chunks(self.source, self.chunk_size, self.dtype)
+        X, y = self.source
+        return iter_frame_chunks(X, y, self.chunk_size)
+
+
+def as_chunks(data, chunk_size: int = None) -> DataChunks:
+    if isinstance(data, DataChunks):
+        return data
+    return DataChunks(data, chunk_size=chunk_size)
+
+
+def sample_chunks(
+    chunks,
+    sample_size: int,
+    random_state: int = 42,
+    return_labels: bool = False,
+):
+    """
+    Uniform sample of at most ``sample_size`` rows from a chunk stream in one
+    pass, returned in stream order. Streams shorter than ``sample_size`` are
+    returned whole. With ``return_labels`` the sampled (X, y) pair is returned.
+    """
+    rng = np.random.default_rng(random_state)
+    kept_X, kept_y, kept_keys, kept_pos = None, np.empty(0), np.empty(0), np.empty(0, dtype=np.int64)
+    offset = 0
+    for X, y in chunks:
+        keys = rng.random(len(X))
+        pos = np.arange(offset, offset + len(X))
+        offset += len(X)
+        X = X.reset_index(drop=True)
+        merged_X = X if kept_X is None else pd.concat([kept_X, X], ignore_index=True)
+        merged_y = np.concatenate([kept_y, np.asarray(y)]) if return_labels else kept_y
+        merged_keys = np.concatenate([kept_keys, keys])
+        merged_pos = np.concatenate([kept_pos, pos])
+        if len(merged_keys) > sample_size:
+            keep = np.argpartition(merged_keys, sample_size - 1)[:sample_size]
+            keep.sort()
+            merged_X = merged_X.iloc[keep].reset_index(drop=True)
+            if return_labels:
+                merged_y = merged_y[keep]
+            merged_keys = merged_keys[keep]
+            merged_pos = merged_pos[keep]
+        kept_X, kept_y, kept_keys, kept_pos = merged_X, merged_y, merged_keys, merged_pos
+    if kept_X is None:
+        raise ValueError("Cannot sample an empty chunk stream")
+    order = np.argsort(kept_pos, kind="stable")
+    X = kept_X.iloc[order].reset_index(drop=True)
+    if return_labels:
+        return X, pd.Series(kept_y[order])
+    return X
 
 
 def save_model(model, path: Path = None) -> Path:
@@ -95,10 +393,7 @@ def load_model(path: Path = None):
 
 
 def hash_file(path: Path) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            if not chunk:
-                break
-            h.update(chunk)
-    return h.hexdigest()
+    # Imported here because src.hashing builds on the paths defined above.
+    from src.hashing import file_digest
+
+    return file_digest(path)